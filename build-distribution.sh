@@ -24,6 +24,7 @@ if [ ! -f "$CREDENTIALS_FILE" ]; then
     echo '  GEMINI_API_KEY="your-key-here"'
     echo '  SUPABASE_URL="https://xxx.supabase.co"'
     echo '  SUPABASE_ANON_KEY="your-anon-key"'
+    echo '  BSD_RELEASE_KEY="release-key"      # optional, see README'
     echo ""
     exit 1
 fi
@@ -60,6 +61,7 @@ echo "Baking in credentials..."
 sed -e "s|__GEMINI_API_KEY__|$GEMINI_API_KEY|g" \
     -e "s|__SUPABASE_URL__|${SUPABASE_URL:-}|g" \
     -e "s|__SUPABASE_ANON_KEY__|${SUPABASE_ANON_KEY:-}|g" \
+    -e "s|__BSD_RELEASE_KEY__|${BSD_RELEASE_KEY:-}|g" \
     "$SCRIPT_DIR/install-mac-silent.sh" > "$BUILD_DIR/$PACKAGE_NAME/install-mac-silent.sh"
 
 cp "$SCRIPT_DIR/uninstall-mac.sh" "$BUILD_DIR/$PACKAGE_NAME/"
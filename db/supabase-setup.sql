@@ -40,9 +40,27 @@ CREATE INDEX IF NOT EXISTS idx_gaps_status ON gaps(status);
 CREATE INDEX IF NOT EXISTS idx_gaps_confidence ON gaps(confidence);
 CREATE INDEX IF NOT EXISTS idx_gaps_frequency ON gaps(frequency DESC);
 
+-- Usage counters table
+-- Static snippet uses rolled up per (trigger, user, os, hour) by sync_logs.py
+-- when aggregate_usage is on. AI events keep a full row in usage_logs.
+CREATE TABLE IF NOT EXISTS usage_counters (
+    id BIGSERIAL PRIMARY KEY,
+    trigger TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    os TEXT NOT NULL DEFAULT '',
+    hour TIMESTAMPTZ NOT NULL,
+    count INT NOT NULL DEFAULT 1,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (trigger, user_id, os, hour)
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_counters_hour ON usage_counters(hour DESC);
+CREATE INDEX IF NOT EXISTS idx_usage_counters_trigger ON usage_counters(trigger);
+
 -- Enable Row Level Security (RLS)
 ALTER TABLE usage_logs ENABLE ROW LEVEL SECURITY;
 ALTER TABLE gaps ENABLE ROW LEVEL SECURITY;
+ALTER TABLE usage_counters ENABLE ROW LEVEL SECURITY;
 
 -- Allow anonymous inserts (for logging from scripts)
 -- This is safe because we're only allowing INSERT, not SELECT/UPDATE/DELETE
@@ -56,6 +74,11 @@ ON gaps FOR INSERT
 TO anon
 WITH CHECK (true);
 
+CREATE POLICY "Allow anonymous inserts to usage_counters"
+ON usage_counters FOR INSERT
+TO anon
+WITH CHECK (true);
+
 -- For the dashboard (authenticated users can read)
 -- You may want to add more restrictive policies based on your auth setup
 CREATE POLICY "Allow authenticated reads on usage_logs"
@@ -68,6 +91,11 @@ ON gaps FOR SELECT
 TO authenticated
 USING (true);
 
+CREATE POLICY "Allow authenticated reads on usage_counters"
+ON usage_counters FOR SELECT
+TO authenticated
+USING (true);
+
 CREATE POLICY "Allow authenticated updates on gaps"
 ON gaps FOR UPDATE
 TO authenticated
@@ -75,6 +103,7 @@ USING (true);
 
 -- Function to update gap frequency on duplicate questions
 -- (Optional: call this from a trigger or manually)
+-- SECURITY DEFINER: inserts come from anon, which can't UPDATE gaps itself
 CREATE OR REPLACE FUNCTION update_gap_frequency()
 RETURNS TRIGGER AS $$
 BEGIN
@@ -93,7 +122,7 @@ BEGIN
     -- Duplicate found and updated, don't insert new row
     RETURN NULL;
 END;
-$$ LANGUAGE plpgsql;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
 
 -- Create trigger for gap deduplication
 DROP TRIGGER IF EXISTS gaps_dedup_trigger ON gaps;
@@ -102,16 +131,53 @@ CREATE TRIGGER gaps_dedup_trigger
     FOR EACH ROW
     EXECUTE FUNCTION update_gap_frequency();
 
+-- Function to add counts when the same (trigger, user, os, hour) is synced again
+-- (e.g. a rep syncs twice within the same hour)
+-- SECURITY DEFINER: inserts come from anon, which can't UPDATE usage_counters itself
+CREATE OR REPLACE FUNCTION add_usage_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE usage_counters
+    SET count = count + NEW.count
+    WHERE trigger = NEW.trigger
+    AND user_id = NEW.user_id
+    AND os = NEW.os
+    AND hour = NEW.hour;
+
+    -- New bucket
+    IF NOT FOUND THEN
+        RETURN NEW;
+    END IF;
+
+    -- Existing bucket updated, don't insert new row
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS usage_counters_merge_trigger ON usage_counters;
+CREATE TRIGGER usage_counters_merge_trigger
+    BEFORE INSERT ON usage_counters
+    FOR EACH ROW
+    EXECUTE FUNCTION add_usage_counts();
+
 -- View for weekly analytics
 CREATE OR REPLACE VIEW weekly_usage AS
 SELECT
-    DATE_TRUNC('week', timestamp) as week,
+    week,
     trigger,
     confidence,
-    COUNT(*) as count
-FROM usage_logs
-WHERE timestamp > NOW() - INTERVAL '8 weeks'
-GROUP BY DATE_TRUNC('week', timestamp), trigger, confidence
+    SUM(count) as count
+FROM (
+    SELECT DATE_TRUNC('week', timestamp) as week, trigger, confidence, 1 as count
+    FROM usage_logs
+    WHERE timestamp > NOW() - INTERVAL '8 weeks'
+    UNION ALL
+    -- Aggregated static snippet uses (no confidence)
+    SELECT DATE_TRUNC('week', hour), trigger, NULL, count
+    FROM usage_counters
+    WHERE hour > NOW() - INTERVAL '8 weeks'
+) events
+GROUP BY week, trigger, confidence
 ORDER BY week DESC, count DESC;
 
 -- View for top gaps (unanswered questions)
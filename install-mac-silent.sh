@@ -11,6 +11,7 @@ set -e
 GEMINI_API_KEY="__GEMINI_API_KEY__"
 SUPABASE_URL="__SUPABASE_URL__"
 SUPABASE_ANON_KEY="__SUPABASE_ANON_KEY__"
+RELEASE_KEY="__BSD_RELEASE_KEY__"
 GITHUB_REPO="Black-Sand-Distribution/bsd-salescopilot"
 GITHUB_BRANCH="main"
 
@@ -117,7 +118,8 @@ cat > "$CONFIG_FILE" << EOF
   "user_id": "$USER_ID",
   "github_repo": "$GITHUB_REPO",
   "github_branch": "$GITHUB_BRANCH",
-  "sync_enabled": true
+  "sync_enabled": true,
+  "release_key": "$RELEASE_KEY"
 }
 EOF
 log "Config saved"
@@ -137,22 +139,23 @@ if [ -f "$COPILOT_PATH/install/com.bsd.salescopilot.env.plist" ]; then
     log "Installed env service"
 fi
 
-# Log sync service
-SYNC_PLIST="$HOME/Library/LaunchAgents/com.bsd.salescopilot.sync.plist"
-if [ -f "$COPILOT_PATH/install/com.bsd.salescopilot.sync.plist" ]; then
-    sed "s|__BSD_COPILOT_PATH__|$COPILOT_PATH|g" "$COPILOT_PATH/install/com.bsd.salescopilot.sync.plist" > "$SYNC_PLIST"
-    launchctl unload "$SYNC_PLIST" 2>/dev/null || true
-    launchctl load "$SYNC_PLIST"
-    log "Installed log sync service"
-fi
+# Remove legacy fixed-interval sync services (replaced by the scheduler)
+for LEGACY in sync snippetsync; do
+    LEGACY_PLIST="$HOME/Library/LaunchAgents/com.bsd.salescopilot.$LEGACY.plist"
+    if [ -f "$LEGACY_PLIST" ]; then
+        launchctl unload "$LEGACY_PLIST" 2>/dev/null || true
+        rm -f "$LEGACY_PLIST"
+        log "Removed legacy $LEGACY service"
+    fi
+done
 
-# Snippet sync service
-SNIPPET_PLIST="$HOME/Library/LaunchAgents/com.bsd.salescopilot.snippetsync.plist"
-if [ -f "$COPILOT_PATH/install/com.bsd.salescopilot.snippetsync.plist" ]; then
-    sed -e "s|__BSD_COPILOT_PATH__|$COPILOT_PATH|g" -e "s|__HOME__|$HOME|g" "$COPILOT_PATH/install/com.bsd.salescopilot.snippetsync.plist" > "$SNIPPET_PLIST"
-    launchctl unload "$SNIPPET_PLIST" 2>/dev/null || true
-    launchctl load "$SNIPPET_PLIST"
-    log "Installed snippet sync service"
+# Sync scheduler (log sync + snippet sync, adaptive intervals with jitter)
+SCHEDULER_PLIST="$HOME/Library/LaunchAgents/com.bsd.salescopilot.scheduler.plist"
+if [ -f "$COPILOT_PATH/install/com.bsd.salescopilot.scheduler.plist" ]; then
+    sed -e "s|__BSD_COPILOT_PATH__|$COPILOT_PATH|g" -e "s|__HOME__|$HOME|g" "$COPILOT_PATH/install/com.bsd.salescopilot.scheduler.plist" > "$SCHEDULER_PLIST"
+    launchctl unload "$SCHEDULER_PLIST" 2>/dev/null || true
+    launchctl load "$SCHEDULER_PLIST"
+    log "Installed sync scheduler service"
 fi
 
 # --- Restart Espanso ---
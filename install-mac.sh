@@ -171,6 +171,10 @@ if [ ! -f "$CONFIG_FILE" ]; then
     read -p "  Supabase URL: " SUPABASE_URL
     read -p "  Supabase anon key: " SUPABASE_KEY
 
+    # Release key (optional) - must match BSD_RELEASE_KEY used by build_release.py
+    echo ""
+    read -p "Release key (optional - press Enter to skip): " RELEASE_KEY
+
     # GitHub repo settings
     GITHUB_REPO="Black-Sand-Distribution/bsd-salescopilot"
     GITHUB_BRANCH="main"
@@ -187,7 +191,8 @@ if [ ! -f "$CONFIG_FILE" ]; then
   "user_id": "$USER_ID",
   "github_repo": "$GITHUB_REPO",
   "github_branch": "$GITHUB_BRANCH",
-  "sync_enabled": true
+  "sync_enabled": true,
+  "release_key": "$RELEASE_KEY"
 }
 EOF
     echo -e "${GREEN}✓ Config saved to $CONFIG_FILE${NC}"
@@ -201,26 +206,25 @@ echo "Setting up background services..."
 mkdir -p "$COPILOT_PATH/scripts/.logs"
 mkdir -p "$HOME/Library/Logs/BSDSalesCopilot"
 
-# --- 8a: Log sync (local logs to Supabase) ---
-PLIST_TEMPLATE="$COPILOT_PATH/install/com.bsd.salescopilot.sync.plist"
-PLIST_TARGET="$HOME/Library/LaunchAgents/com.bsd.salescopilot.sync.plist"
-
-if [ -f "$PLIST_TEMPLATE" ]; then
-    sed "s|__BSD_COPILOT_PATH__|$COPILOT_PATH|g" "$PLIST_TEMPLATE" > "$PLIST_TARGET"
-    launchctl unload "$PLIST_TARGET" 2>/dev/null || true
-    launchctl load "$PLIST_TARGET"
-    echo -e "${GREEN}  ✓ Log sync service installed${NC}"
-fi
+# --- 8a: Remove legacy fixed-interval sync services (replaced by the scheduler) ---
+for LEGACY in sync snippetsync; do
+    LEGACY_PLIST="$HOME/Library/LaunchAgents/com.bsd.salescopilot.$LEGACY.plist"
+    if [ -f "$LEGACY_PLIST" ]; then
+        launchctl unload "$LEGACY_PLIST" 2>/dev/null || true
+        rm -f "$LEGACY_PLIST"
+        echo "  Removed legacy $LEGACY service"
+    fi
+done
 
-# --- 8b: Snippet sync (GitHub to local) ---
-SNIPPET_PLIST_TEMPLATE="$COPILOT_PATH/install/com.bsd.salescopilot.snippetsync.plist"
-SNIPPET_PLIST_TARGET="$HOME/Library/LaunchAgents/com.bsd.salescopilot.snippetsync.plist"
+# --- 8b: Sync scheduler (log sync to Supabase + snippet sync from GitHub) ---
+SCHEDULER_PLIST_TEMPLATE="$COPILOT_PATH/install/com.bsd.salescopilot.scheduler.plist"
+SCHEDULER_PLIST_TARGET="$HOME/Library/LaunchAgents/com.bsd.salescopilot.scheduler.plist"
 
-if [ -f "$SNIPPET_PLIST_TEMPLATE" ]; then
-    sed -e "s|__BSD_COPILOT_PATH__|$COPILOT_PATH|g" -e "s|__HOME__|$HOME|g" "$SNIPPET_PLIST_TEMPLATE" > "$SNIPPET_PLIST_TARGET"
-    launchctl unload "$SNIPPET_PLIST_TARGET" 2>/dev/null || true
-    launchctl load "$SNIPPET_PLIST_TARGET"
-    echo -e "${GREEN}  ✓ Snippet sync service installed (updates from GitHub every 5 min)${NC}"
+if [ -f "$SCHEDULER_PLIST_TEMPLATE" ]; then
+    sed -e "s|__BSD_COPILOT_PATH__|$COPILOT_PATH|g" -e "s|__HOME__|$HOME|g" "$SCHEDULER_PLIST_TEMPLATE" > "$SCHEDULER_PLIST_TARGET"
+    launchctl unload "$SCHEDULER_PLIST_TARGET" 2>/dev/null || true
+    launchctl load "$SCHEDULER_PLIST_TARGET"
+    echo -e "${GREEN}  ✓ Sync scheduler installed (logs + snippets, adaptive intervals)${NC}"
 fi
 
 echo -e "${GREEN}  ✓ Logs will be written to ~/Library/Logs/BSDSalesCopilot/${NC}"
@@ -250,8 +254,8 @@ echo ""
 echo "To test, copy some text and type ;p1 in any app."
 echo ""
 echo "Background services:"
-echo "  • Snippets auto-update from GitHub every 5 minutes"
-echo "  • Usage logs sync to Supabase (if configured)"
+echo "  • Snippets auto-update from GitHub (every ~10 min, less often when idle)"
+echo "  • Usage logs sync to Supabase (if configured, every ~5 min)"
 echo "  • Logs: ~/Library/Logs/BSDSalesCopilot/"
 echo ""
 echo -e "${YELLOW}Note: Snippets will update automatically. No action needed!${NC}"
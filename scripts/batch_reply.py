@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Batch Reply Script - Runs a file of customer messages through the reply pipeline
+Useful for clearing an exported WhatsApp backlog in one go
+
+Usage: python3 batch_reply.py <input.csv|input.jsonl> [-o replies.jsonl] [--workers N] [--close] [--kb eu,...]
+  - Input: JSONL (one object per line) or CSV with a header row
+    Message field: "message", "question" or "text"; optional "id" field
+  - Output: JSONL, one reply per line, written as each one completes
+  - Re-running with the same output file skips ids already answered (resume)
+  - Each message uses the KB collections it needs (or the ones given with --kb)
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from utils import load_config, start_timings
+from gemini import get_cached_context
+from router import get_tiers
+from response_cache import ResponseCache
+from kb_collections import KnowledgeCollections, DEFAULT_COLLECTION
+from reply import (
+    build_system_prompt,
+    answer_question,
+    log_reply,
+)
+
+MESSAGE_FIELDS = ("message", "question", "text")
+DEFAULT_WORKERS = 4
+
+# Persist the response cache every N completed messages
+CACHE_SAVE_EVERY = 25
+
+
+def read_messages(path):
+    """
+    Yield (id, message) from a CSV or JSONL file
+    Rows without an id are numbered by position
+    """
+    is_csv = path.lower().endswith(".csv")
+
+    with open(path, "r", newline="" if is_csv else None, encoding="utf-8") as f:
+        rows = csv.DictReader(f) if is_csv else (
+            json.loads(line) for line in f if line.strip()
+        )
+        for n, row in enumerate(rows, 1):
+            message = next((row[k] for k in MESSAGE_FIELDS if row.get(k)), None)
+            if not message or not message.strip():
+                continue
+            yield str(row.get("id") or f"row-{n}"), message.strip()
+
+
+def read_done_ids(path):
+    """Ids already present in an existing output file"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["id"])
+            except (json.JSONDecodeError, KeyError):
+                pass  # Partial last line from an interrupted run
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate replies for a file of customer messages")
+    parser.add_argument("input", help="CSV or JSONL file of customer messages")
+    parser.add_argument("-o", "--output", help="Output JSONL (default: <input>.replies.jsonl)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Concurrent requests")
+    parser.add_argument("--close", action="store_true", help="Include closing call-to-action")
+    parser.add_argument("--kb", help="Comma-separated KB collections to use for every message")
+    args = parser.parse_args()
+
+    output_path = args.output or os.path.splitext(args.input)[0] + ".replies.jsonl"
+    workers = max(1, args.workers)
+
+    config = load_config()
+    api_key = config.get("gemini_api_key")
+    if not api_key:
+        print("Error: GEMINI_API_KEY not found", file=sys.stderr)
+        sys.exit(1)
+
+    # Collection indexes are loaded once, on first use, and shared by every worker
+    # Edits during the run are picked up incrementally (see process())
+    collections = KnowledgeCollections(config)
+    kb_names = args.kb.split(",") if args.kb else None
+    try:
+        kb = collections.load("", kb_names)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not kb.text:
+        print(f"Error: Knowledge base not found at {collections.specs[DEFAULT_COLLECTION]['path']}", file=sys.stderr)
+        sys.exit(1)
+
+    cache = ResponseCache() if config.get("response_cache", True) else None
+
+    # Warm the context cache up front so workers don't race to create it
+    # (for the collections every message uses; keyword-picked extras warm on first use)
+    if config.get("context_cache", True):
+        system_prompt = build_system_prompt(kb.text, args.close)
+        for tier in get_tiers(config):
+            get_cached_context(tier["model"], system_prompt, api_key)
+
+    done = read_done_ids(output_path)
+    if done:
+        print(f"Resuming: {len(done)} already answered in {output_path}", file=sys.stderr)
+
+    stats = {"answered": 0, "cached": 0, "errors": 0, "skipped": 0}
+    write_lock = threading.Lock()
+    out = open(output_path, "a", encoding="utf-8")
+
+    def process(msg_id, message):
+        # Timings (with BSD_PROFILE=1) cover this message only, not the whole batch
+        start_timings()
+        kb = collections.get(collections.pick(message, kb_names))
+
+        # Cheap stat() check - re-indexes only edited sections if the KB changed
+        changed = kb.refresh()
+        if changed:
+            kb.save()
+            if cache is not None:
+                cache.invalidate(changed)
+
+        result = answer_question(message, kb, config, args.close, cache)
+        log_reply("batch", message, result, config)
+
+        # Leave failures out of the output so a re-run retries them
+        if result["reply"].startswith("Error:"):
+            return result
+
+        record = {
+            "id": msg_id,
+            "question": message,
+            "reply": result["reply"],
+            "confidence": result["confidence"],
+            "topic": result["topic"],
+            "cached": result["cached"],
+            "model": result["metrics"].get("model"),
+            "latency_ms": result["metrics"].get("latency_ms"),
+        }
+        with write_lock:
+            out.write(json.dumps(record) + "\n")
+            out.flush()
+        return result
+
+    start = time.perf_counter()
+    in_flight = set()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for msg_id, message in read_messages(args.input):
+                if msg_id in done:
+                    stats["skipped"] += 1
+                    continue
+
+                # Bound queued work so huge inputs aren't read into memory at once
+                if len(in_flight) >= workers * 2:
+                    finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    _collect(finished, stats, cache)
+
+                in_flight.add(pool.submit(process, msg_id, message))
+
+            finished, _ = wait(in_flight)
+            _collect(finished, stats, cache)
+    except KeyboardInterrupt:
+        print("\nInterrupted - re-run the same command to resume", file=sys.stderr)
+    finally:
+        out.close()
+        if cache is not None:
+            cache.save()
+
+    elapsed = time.perf_counter() - start
+    total = stats["answered"] + stats["errors"]
+    rate = total / elapsed * 60 if elapsed > 0 else 0
+
+    print(f"Processed {total} messages in {elapsed:.1f}s ({rate:.1f}/min)", file=sys.stderr)
+    print(f"  Answered: {stats['answered']} ({stats['cached']} from cache)", file=sys.stderr)
+    print(f"  Errors: {stats['errors']}", file=sys.stderr)
+    print(f"  Skipped (already done): {stats['skipped']}", file=sys.stderr)
+    print(f"  Output: {output_path}", file=sys.stderr)
+
+
+def _collect(finished, stats, cache):
+    """Tally finished futures, periodically persisting the response cache"""
+    for future in finished:
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"  Error: {e}", file=sys.stderr)
+            stats["errors"] += 1
+            continue
+
+        if result["reply"].startswith("Error:"):
+            stats["errors"] += 1
+        else:
+            stats["answered"] += 1
+            stats["cached"] += int(result["cached"])
+
+        if cache is not None and (stats["answered"] + stats["errors"]) % CACHE_SAVE_EVERY == 0:
+            cache.save()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Generate manifest.json for snippet sync
+Lists SHA-256, size and per-block hashes of every synced file, so clients
+skip unchanged files without downloading them and patch large changed files
+with Range requests instead of fetching them whole.
+
+Usage: python3 build_manifest.py [--check]
+  - Writes manifest.json at the repo root; commit it together with the files
+  - --check: exit 1 if manifest.json is missing or out of date (nothing written)
+
+Without a manifest, clients fall back to downloading each file (gzipped).
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from sync_snippets import DEFAULT_CONFIG, MANIFEST_FILE, PROJECT_DIR
+
+# Delta granularity; files smaller than this are always fetched whole
+BLOCK_SIZE = 64 * 1024
+
+
+def describe_file(path, block_size=BLOCK_SIZE):
+    """SHA-256, size and block hashes of one file, read block by block"""
+    digest = hashlib.sha256()
+    blocks = []
+    size = 0
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+            blocks.append(hashlib.sha256(block).hexdigest())
+            size += len(block)
+    return {"sha256": digest.hexdigest(), "size": size, "blocks": blocks}
+
+
+def build_manifest(files, project_dir=PROJECT_DIR, block_size=BLOCK_SIZE):
+    manifest = {"version": 1, "block_size": block_size, "files": {}}
+    for filepath in files:
+        path = os.path.join(project_dir, filepath)
+        if os.path.exists(path):
+            manifest["files"][filepath] = describe_file(path, block_size)
+        else:
+            print(f"Warning: {filepath} not found, left out of manifest", file=sys.stderr)
+    return manifest
+
+
+def main():
+    check = "--check" in sys.argv
+    path = os.path.join(PROJECT_DIR, MANIFEST_FILE)
+
+    content = json.dumps(build_manifest(DEFAULT_CONFIG["files_to_sync"]), indent=2) + "\n"
+
+    current = None
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            current = f.read()
+
+    if current == content:
+        print("Manifest up to date")
+        return
+
+    if check:
+        print(f"Out of date: {MANIFEST_FILE} - run python3 scripts/build_manifest.py", file=sys.stderr)
+        sys.exit(1)
+
+    with open(path, "w") as f:
+        f.write(content)
+    print(f"Wrote {MANIFEST_FILE}")
+
+
+if __name__ == "__main__":
+    main()
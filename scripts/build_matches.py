@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Generate Espanso match files from match/catalog.json
+
+Usage: python3 build_matches.py [--check]
+  - Writes match/base.yml and match/faq.yml (one file per catalog entry)
+  - --check: exit 1 if the generated files are out of date (nothing written)
+
+Static snippets are emitted as inline text. Logging goes through
+log_trigger.sh, a tiny shell helper that appends one line to the local log,
+so typing ;hi no longer starts a Python interpreter (only installs that
+don't have the helper yet fall back to log_snippet.py).
+
+An entry with "regex" instead of "trigger" becomes an Espanso regex trigger;
+its named groups can be passed on in "args" as {{name}} (e.g. the chat name
+in ;reply-c1/).
+"""
+
+import json
+import os
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+MATCH_DIR = os.path.join(PROJECT_DIR, "match")
+CATALOG_PATH = os.path.join(MATCH_DIR, "catalog.json")
+
+GENERATED_NOTICE = "Generated from match/catalog.json by scripts/build_matches.py - do not edit by hand"
+
+# log_snippet.py logs (and upgrades the install) where log_trigger.sh is missing
+LOG_CMD = ('"sh \\"$BSD_COPILOT_PATH/scripts/log_trigger.sh\\" {trigger} 2>/dev/null'
+           ' || python3 \\"$BSD_COPILOT_PATH/scripts/log_snippet.py\\" {trigger}"')
+SCRIPT_CMD = '"python3 \\"$BSD_COPILOT_PATH/scripts/{script}\\"{args}"'
+
+
+def quote(text):
+    """YAML double-quoted scalar (JSON string escaping is valid YAML)"""
+    return json.dumps(text, ensure_ascii=False)
+
+
+def snippet_name(snippet):
+    """The trigger, or the regex for regex entries"""
+    return snippet.get("trigger") or snippet["regex"]
+
+
+def load_catalog(path=CATALOG_PATH):
+    """Load and validate the snippet catalog"""
+    with open(path, "r", encoding="utf-8") as f:
+        catalog = json.load(f)
+
+    seen = set()
+    for match_file in catalog["files"]:
+        for snippet in match_file["snippets"]:
+            if ("trigger" in snippet) == ("regex" in snippet):
+                raise ValueError(f"Catalog entry needs exactly one of 'trigger' or 'regex': {snippet}")
+            trigger = snippet_name(snippet)
+            if trigger in seen:
+                raise ValueError(f"Duplicate trigger in catalog: {trigger}")
+            seen.add(trigger)
+            if ("text" in snippet) == ("script" in snippet):
+                raise ValueError(f"{trigger}: needs exactly one of 'text' or 'script'")
+
+    return catalog
+
+
+def render_snippet(snippet):
+    """YAML lines for one match"""
+    lines = []
+
+    for comment in snippet.get("comment", []):
+        lines.append(f"  # {comment}")
+    if snippet.get("description"):
+        lines.append("  # " + "=" * 44)
+        lines.append(f"  # {snippet_name(snippet)} - {snippet['description']}")
+        lines.append("  # " + "=" * 44)
+
+    if "regex" in snippet:
+        lines.append(f"  - regex: {quote(snippet['regex'])}")
+    else:
+        lines.append(f"  - trigger: {quote(snippet['trigger'])}")
+
+    if "text" in snippet:
+        # Static text inline; the shell var prints nothing and just logs
+        lines += [
+            f"    replace: {quote(snippet['text'] + '{{log}}')}",
+            "    vars:",
+            "      - name: log",
+            "        type: shell",
+            "        params:",
+            "          cmd: " + LOG_CMD.format(trigger=quote(snippet_name(snippet)).replace('"', '\\"')),
+        ]
+    else:
+        args = "".join(f" {arg}" for arg in snippet.get("args", []))
+        lines.append('    replace: "{{output}}"')
+        if snippet.get("force_mode"):
+            lines.append(f"    force_mode: {snippet['force_mode']}")
+        lines += [
+            "    vars:",
+            "      - name: output",
+            "        type: shell",
+            "        params:",
+            "          cmd: " + SCRIPT_CMD.format(script=snippet["script"], args=args),
+        ]
+
+    return lines
+
+
+def render_file(match_file):
+    """Full YAML text for one match file"""
+    lines = [f"# {GENERATED_NOTICE}"]
+    lines += [f"# {line}" for line in match_file.get("header", [])]
+    lines += ["", "matches:"]
+
+    for i, snippet in enumerate(match_file["snippets"]):
+        if i:
+            lines.append("")
+        lines += render_snippet(snippet)
+
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    check = "--check" in sys.argv
+
+    catalog = load_catalog()
+    stale = []
+
+    for match_file in catalog["files"]:
+        path = os.path.join(MATCH_DIR, match_file["file"])
+        content = render_file(match_file)
+
+        current = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                current = f.read()
+
+        if current == content:
+            continue
+
+        stale.append(match_file["file"])
+        if not check:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+            print(f"Wrote match/{match_file['file']}")
+
+    if check and stale:
+        print(f"Out of date: {', '.join(stale)} - run python3 scripts/build_matches.py", file=sys.stderr)
+        sys.exit(1)
+
+    if not stale:
+        print("Match files up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Build a release bundle for snippet sync
+Packs every synced file into releases/<release>.tar.gz (with release.json
+listing per-file checksums) and points releases/LATEST at it. Clients poll
+LATEST and apply the whole release in one go.
+
+Usage: python3 build_release.py [--check] [--keep 3]
+  - Commit releases/ together with the files it packs
+  - BSD_RELEASE_KEY=<key>: sign LATEST (clients set the same "release_key");
+    an integrity check only - every install holds the key, see release_bundle
+  - --check: exit 1 if LATEST doesn't match the current files (nothing written)
+  - --keep: bundles to keep in releases/ (older ones are deleted)
+
+Bundles are deterministic: rebuilding unchanged files is a no-op.
+Nothing runs this automatically: once releases/LATEST is committed, rerun it
+(and --check before merging) with every change to a synced file, or clients
+stay on the stale release.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from sync_snippets import DEFAULT_CONFIG, PROJECT_DIR
+import release_bundle
+
+
+def read_pointer(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+def prune_bundles(releases_dir, keep, current):
+    """Delete all but the newest `keep` bundles (never the current one)"""
+    bundles = sorted(n for n in os.listdir(releases_dir) if n.endswith(".tar.gz"))
+    for name in bundles[:-keep] if keep > 0 else bundles:
+        if name != current:
+            os.remove(os.path.join(releases_dir, name))
+            print(f"Deleted old bundle {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a snippet release bundle")
+    parser.add_argument("--check", action="store_true", help="Fail if LATEST is out of date")
+    parser.add_argument("--keep", type=int, default=3, help="Bundles to keep in releases/")
+    args = parser.parse_args()
+
+    releases_dir = os.path.join(PROJECT_DIR, release_bundle.RELEASES_DIR)
+    pointer_path = os.path.join(PROJECT_DIR, release_bundle.POINTER_FILE)
+
+    files = DEFAULT_CONFIG["files_to_sync"]
+    missing = [f for f in files if not os.path.exists(os.path.join(PROJECT_DIR, f))]
+    if missing:
+        print(f"Error: Missing files: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+
+    bundle, manifest = release_bundle.build_bundle(files, PROJECT_DIR)
+    sha = hashlib.sha256(bundle).hexdigest()
+
+    current = read_pointer(pointer_path)
+    if current and current.get("sha256") == sha:
+        print(f"Release {current['release']} up to date")
+        return
+
+    if args.check:
+        print(f"Out of date: {release_bundle.POINTER_FILE} - run python3 scripts/build_release.py", file=sys.stderr)
+        sys.exit(1)
+
+    now = datetime.now(timezone.utc)
+    release = now.strftime("%Y%m%d-%H%M%S")
+    bundle_name = f"{release}.tar.gz"
+    pointer = {
+        "format": release_bundle.FORMAT_VERSION,
+        "release": release,
+        "created": now.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "bundle": f"{release_bundle.RELEASES_DIR}/{bundle_name}",
+        "sha256": sha,
+        "size": len(bundle),
+        "files": len(manifest["files"]),
+    }
+    key = os.environ.get("BSD_RELEASE_KEY")
+    if key:
+        pointer["signature"] = release_bundle.sign_pointer(pointer, key)
+
+    os.makedirs(releases_dir, exist_ok=True)
+    with open(os.path.join(releases_dir, bundle_name), "wb") as f:
+        f.write(bundle)
+    # Pointer last, so it never names a bundle that isn't written yet
+    with open(pointer_path, "w") as f:
+        f.write(json.dumps(pointer, indent=2) + "\n")
+
+    print(f"Wrote release {release}: {len(manifest['files'])} files, {len(bundle)} bytes"
+          + (" (signed)" if key else " (unsigned - set BSD_RELEASE_KEY to sign)"))
+    prune_bundles(releases_dir, args.keep, bundle_name)
+
+
+if __name__ == "__main__":
+    main()
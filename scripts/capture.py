@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Question capture for usage and gap logs
+Decides, at write time, how much of a customer question leaves the machine.
+
+  "capture_mode": "full"    - question text (up to 500 chars), as before
+  "capture_mode": "hashed"  - only a short redacted prefix
+                              ("capture_prefix_chars", default 40; 0 = none)
+
+Hashed mode adds question_hash: a hash of the normalized question (same
+normalization as the response cache), so repeats can still be counted,
+deduplicated as gaps and matched to cached replies without the text. Full
+mode rows stay exactly as before, so projects that haven't applied the
+question_hash migration keep accepting them.
+"""
+
+import hashlib
+import re
+
+from response_cache import normalize_question
+
+MAX_QUESTION_CHARS = 500
+MAX_RESPONSE_CHARS = 1000
+DEFAULT_PREFIX_CHARS = 40
+
+# Contact details and reference numbers never go into a prefix
+_REDACTIONS = [
+    (re.compile(r"\S+@\S+\.\w+"), "[email]"),
+    (re.compile(r"https?://\S+|www\.\S+"), "[url]"),
+    (re.compile(r"\+?\d[\d\s().-]{5,}\d"), "[number]"),
+]
+
+
+def question_hash(question):
+    """Fixed-size hash of the normalized question (32 hex chars)"""
+    return hashlib.sha256(normalize_question(question).encode("utf-8")).hexdigest()[:32]
+
+
+def redact(text):
+    for pattern, replacement in _REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+def redacted_prefix(question, chars=DEFAULT_PREFIX_CHARS):
+    """First `chars` characters of the question, contact details masked"""
+    if chars <= 0:
+        return ""
+    # Redact a little more than the prefix, so a number cut at the edge is still masked
+    prefix = redact(" ".join(question[:chars * 2].split()))
+    if len(prefix) > chars or len(question) > chars * 2:
+        return prefix[:chars].rstrip() + "..."
+    return prefix
+
+
+def capture_question(question, config):
+    """Log fields for a question: {question} in full mode, {question, question_hash} hashed"""
+    if config.get("capture_mode", "full") != "hashed":
+        return {"question": question[:MAX_QUESTION_CHARS]}
+    return {
+        "question": redacted_prefix(question, config.get("capture_prefix_chars", DEFAULT_PREFIX_CHARS)),
+        "question_hash": question_hash(question),
+    }
+
+
+def capture_response(response, config):
+    """Response text to log, or None (never stored in hashed mode)"""
+    if not config.get("log_responses") or config.get("capture_mode", "full") == "hashed":
+        return None
+    return response[:MAX_RESPONSE_CHARS]
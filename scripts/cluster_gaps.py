@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Gap clustering for knowledge base triage
+Groups paraphrased gap questions ("do u ship to lagos", "Can you deliver to
+Lagos Nigeria?") into clusters and ranks them by total frequency, so the
+most-asked missing KB sections get written first.
+
+MinHash + LSH banding finds candidate pairs without comparing every pair, so
+the work grows roughly linearly (10-20 s for 30k varied gaps). Candidates
+are confirmed with TF-IDF cosine similarity and merged with union-find.
+
+Usage: python3 cluster_gaps.py [gaps.csv|gaps.jsonl] [--supabase] [--write]
+                               [-o assignments.csv] [--top 20] [--threshold 0.6]
+  - File: export of the gaps table (question; optional id, frequency, topic)
+  - --supabase: read open gaps (new/reviewed) from Supabase instead
+  - --write: with --supabase, store cluster_id/cluster_label on each gap
+    (needs supabase_service_key in config.json - anon can't update)
+  - No source: cluster the gaps still waiting in the local log
+  - -o: write one row per gap with its cluster
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+from urllib.error import URLError, HTTPError
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from kb_index import tokenize
+from response_cache import normalize_question
+from local_log import read_logs
+from utils import load_config
+
+# MinHash signature = BANDS * ROWS values; two questions with Jaccard
+# similarity s share a band with probability 1 - (1 - s^ROWS)^BANDS
+# (about 0.5 at s = 0.45 with 16 x 4)
+BANDS = 16
+ROWS = 4
+
+# TF-IDF cosine needed to put two questions in the same cluster
+SIMILARITY_THRESHOLD = 0.6
+
+# Buckets bigger than this are stopword-like noise; skip them
+MAX_BUCKET = 500
+
+PAGE_SIZE = 1000
+_PRIME = (1 << 61) - 1
+
+
+def shingles(question):
+    """Word unigrams + bigrams of a question"""
+    tokens = tokenize(question)
+    return set(tokens) | {f"{a} {b}" for a, b in zip(tokens, tokens[1:])}
+
+
+def _shingle_hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash(shingle_hashes, params):
+    """MinHash signature from pre-hashed shingles"""
+    return [min((a * h + b) % _PRIME for h in shingle_hashes) for a, b in params]
+
+
+def tfidf_vectors(docs):
+    """Unit-length sparse TF-IDF vectors ({term: weight}) for token lists"""
+    df = {}
+    for tokens in docs:
+        for term in set(tokens):
+            df[term] = df.get(term, 0) + 1
+
+    n = len(docs)
+    vectors = []
+    for tokens in docs:
+        tf = {}
+        for term in tokens:
+            tf[term] = tf.get(term, 0) + 1
+        vector = {t: c * (math.log((1 + n) / (1 + df[t])) + 1) for t, c in tf.items()}
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        vectors.append({t: w / norm for t, w in vector.items()})
+    return vectors
+
+
+def cosine(u, v):
+    if len(u) > len(v):
+        u, v = v, u
+    return sum(w * v.get(t, 0.0) for t, w in u.items())
+
+
+def cluster(gaps, threshold=SIMILARITY_THRESHOLD, seed=1):
+    """
+    Cluster gap dicts (question, frequency, optional id/topic)
+    Returns list of clusters, most frequent first:
+      {cluster_id, label, frequency, size, topics, members: [gap, ...]}
+    cluster_id is the smallest member gap id; clusters with no ids (file
+    exports without an id column, the local log) get -rank instead, so they
+    can never collide with a real gap id
+    """
+    # Exact duplicates after normalization are merged up front
+    groups = {}
+    for gap in gaps:
+        groups.setdefault(normalize_question(gap["question"]), []).append(gap)
+    keys = list(groups)
+
+    docs = [tokenize(key) for key in keys]
+    vectors = tfidf_vectors(docs)
+
+    rng = random.Random(seed)
+    params = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(BANDS * ROWS)]
+
+    parent = list(range(len(keys)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # LSH: questions sharing any band of their signature are candidates
+    buckets = {}
+    for i, key in enumerate(keys):
+        hashes = [_shingle_hash(s) for s in shingles(key)]
+        if not hashes:
+            continue
+        signature = minhash(hashes, params)
+        for band in range(BANDS):
+            buckets.setdefault((band, tuple(signature[band * ROWS:(band + 1) * ROWS])), []).append(i)
+
+    checked = set()
+    for members in buckets.values():
+        if len(members) < 2 or len(members) > MAX_BUCKET:
+            continue
+        for x in range(len(members)):
+            for y in range(x + 1, len(members)):
+                i, j = members[x], members[y]
+                if (i, j) in checked or find(i) == find(j):
+                    continue
+                checked.add((i, j))
+                if cosine(vectors[i], vectors[j]) >= threshold:
+                    parent[find(i)] = find(j)
+
+    clustered = {}
+    for i in range(len(keys)):
+        clustered.setdefault(find(i), []).append(i)
+
+    results = []
+    for indexes in clustered.values():
+        members = [gap for i in indexes for gap in groups[keys[i]]]
+
+        # Representative: the question closest to the cluster centroid
+        centroid = {}
+        for i in indexes:
+            for term, weight in vectors[i].items():
+                centroid[term] = centroid.get(term, 0.0) + weight
+        best = max(indexes, key=lambda i: (cosine(vectors[i], centroid), -len(keys[i])))
+        label = max(groups[keys[best]], key=lambda g: g["frequency"])["question"]
+
+        topics = {}
+        for gap in members:
+            if gap.get("topic"):
+                topics[gap["topic"]] = topics.get(gap["topic"], 0) + gap["frequency"]
+
+        ids = [gap["id"] for gap in members if gap.get("id") is not None]
+        results.append({
+            "cluster_id": min(ids) if ids else None,
+            "label": label,
+            "frequency": sum(gap["frequency"] for gap in members),
+            "size": len(members),
+            "topics": sorted(topics, key=topics.get, reverse=True)[:3],
+            "members": members,
+        })
+
+    results.sort(key=lambda c: (c["frequency"], c["size"]), reverse=True)
+    for n, result in enumerate(results, 1):
+        if result["cluster_id"] is None:
+            result["cluster_id"] = -n
+    return results
+
+
+def _gap(row):
+    """Normalize an input row to {id, question, frequency, topic}"""
+    try:
+        frequency = int(row.get("frequency") or 1)
+    except (TypeError, ValueError):
+        frequency = 1
+    gap_id = row.get("id")
+    return {
+        "id": int(gap_id) if str(gap_id or "").isdigit() else None,
+        "question": row["question"].strip(),
+        "frequency": frequency,
+        "topic": row.get("topic") or None,
+    }
+
+
+def read_gap_file(path):
+    """Gaps from a CSV or JSONL export"""
+    is_csv = path.lower().endswith(".csv")
+    with open(path, "r", newline="" if is_csv else None, encoding="utf-8") as f:
+        rows = csv.DictReader(f) if is_csv else (json.loads(line) for line in f if line.strip())
+        return [_gap(row) for row in rows if (row.get("question") or "").strip()]
+
+
+def read_local_gaps():
+    """Gaps still waiting in the local log (not yet synced)"""
+    return [_gap(e) for e in read_logs() if e.get("type") == "gap" and e.get("question")]
+
+
+def _supabase_headers(config):
+    """Service key if configured (needed to update gaps), else the anon key (reads)"""
+    key = config.get("supabase_service_key") or config.get("supabase_anon_key")
+    return {
+        "Content-Type": "application/json",
+        "apikey": key,
+        "Authorization": f"Bearer {key}",
+        "Prefer": "return=minimal",
+    }
+
+
+def read_supabase_gaps(config, pool):
+    """Open gaps (new/reviewed) from Supabase, paged"""
+    gaps = []
+    offset = 0
+    while True:
+        url = (f"{config['supabase_url']}/rest/v1/gaps?select=id,question,frequency,topic"
+               f"&status=in.(new,reviewed)&order=id&limit={PAGE_SIZE}&offset={offset}")
+        _, _, data = pool.request("GET", url, headers=_supabase_headers(config))
+        rows = json.loads(data)
+        gaps += [_gap(row) for row in rows if row.get("question")]
+        if len(rows) < PAGE_SIZE:
+            return gaps
+        offset += PAGE_SIZE
+
+
+def write_supabase_clusters(clusters, config, pool):
+    """Store cluster_id/cluster_label on each gap - one PATCH per cluster"""
+    headers = _supabase_headers(config)
+    written = 0
+    for result in clusters:
+        ids = [gap["id"] for gap in result["members"] if gap["id"] is not None]
+        for start in range(0, len(ids), 200):
+            chunk = ",".join(str(i) for i in ids[start:start + 200])
+            body = json.dumps({"cluster_id": result["cluster_id"], "cluster_label": result["label"][:500]})
+            pool.request("PATCH", f"{config['supabase_url']}/rest/v1/gaps?id=in.({chunk})",
+                         body=body.encode("utf-8"), headers=headers)
+        written += len(ids)
+    return written
+
+
+def write_assignments(clusters, path):
+    """One CSV row per gap with its cluster"""
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "question", "frequency", "cluster_id", "cluster_label", "cluster_frequency"])
+        for result in clusters:
+            for gap in result["members"]:
+                writer.writerow([gap["id"], gap["question"], gap["frequency"],
+                                 result["cluster_id"], result["label"], result["frequency"]])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cluster knowledge gaps and rank them by frequency")
+    parser.add_argument("input", nargs="?", help="CSV or JSONL export of the gaps table")
+    parser.add_argument("--supabase", action="store_true", help="Read open gaps from Supabase")
+    parser.add_argument("--write", action="store_true", help="Write cluster ids back to Supabase")
+    parser.add_argument("-o", "--output", help="CSV of per-gap cluster assignments")
+    parser.add_argument("--top", type=int, default=20, help="Clusters to print")
+    parser.add_argument("--threshold", type=float, default=SIMILARITY_THRESHOLD, help="TF-IDF cosine to merge")
+    args = parser.parse_args()
+
+    config = load_config()
+    pool = None
+    if args.supabase:
+        if not config.get("supabase_url"):
+            print("Error: Supabase not configured", file=sys.stderr)
+            sys.exit(1)
+        from http_pool import ConnectionPool
+        pool = ConnectionPool()
+        gaps = read_supabase_gaps(config, pool)
+    elif args.input:
+        gaps = read_gap_file(args.input)
+    else:
+        gaps = read_local_gaps()
+
+    if not gaps:
+        print("No gaps to cluster")
+        return
+
+    clusters = cluster(gaps, args.threshold)
+    total = sum(c["frequency"] for c in clusters)
+    print(f"{len(gaps)} gaps -> {len(clusters)} clusters ({total} asks)\n")
+    print(f"{'rank':>4} {'asks':>6} {'gaps':>5}  question")
+    for n, result in enumerate(clusters[:args.top], 1):
+        topics = f"  [{', '.join(result['topics'])}]" if result["topics"] else ""
+        print(f"{n:>4} {result['frequency']:>6} {result['size']:>5}  {result['label']}{topics}")
+
+    if args.output:
+        write_assignments(clusters, args.output)
+        print(f"\nWrote {args.output}")
+
+    if args.write:
+        if not args.supabase:
+            print("Error: --write needs --supabase", file=sys.stderr)
+            sys.exit(1)
+        try:
+            written = write_supabase_clusters(clusters, config, pool)
+            print(f"\nStored clusters on {written} gaps")
+        except (URLError, HTTPError) as e:
+            print(f"Error: Could not write clusters: {e}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
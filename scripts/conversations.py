@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Conversation store for BSD Sales Copilot
+Keeps the recent question/answer turns of each customer chat, so a follow-up
+like "and what about Rotterdam?" is answered with a small, targeted context
+instead of the rep pasting the whole history.
+
+A chat is only ever found by an explicit name (trigger suffix, e.g.
+;reply-c1 -> --chat c1). Matching pasted text against stored chats would
+attach one customer's history to another customer's question whenever they
+share a common line, so history is never guessed.
+
+Each chat keeps its last few turns verbatim; older turns are compacted into a
+short extractive summary (first sentence of each side). Chats expire after a
+week and the store keeps at most MAX_CONVERSATIONS files.
+"""
+
+import json
+import os
+import re
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CONVERSATIONS_DIR = os.path.join(SCRIPT_DIR, ".cache", "conversations")
+
+# Turns kept verbatim; older ones are compacted into the summary
+MAX_TURNS = 3
+
+# Summary lines kept (one per compacted turn, oldest dropped)
+MAX_SUMMARY_LINES = 6
+
+# Per-side character limit for a turn in the prompt
+TURN_CHARS = 400
+
+CONVERSATION_TTL = 7 * 24 * 3600
+MAX_CONVERSATIONS = 100
+
+
+def _first_sentence(text, limit=120):
+    """First informative sentence ("Hi there!" / "Absolutely!" are skipped)"""
+    sentences = [s for s in re.split(r"(?<=[.!?])\s+|\n", text.strip()) if s]
+    sentence = next((s for s in sentences if len(s.split()) >= 4), sentences[0] if sentences else "")
+    return _clip(sentence, limit)
+
+
+def _clip(text, limit=TURN_CHARS):
+    text = text.strip()
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+class Conversation:
+    """One chat's recent turns and summary"""
+
+    def __init__(self, key, data=None):
+        data = data or {}
+        self.key = key
+        self.turns = data.get("turns", [])  # [{question, answer, topic, time}]
+        self.summary = data.get("summary", [])
+
+    @property
+    def path(self):
+        return os.path.join(CONVERSATIONS_DIR, f"{self.key}.json")
+
+    def context(self):
+        """Prompt block with the chat so far, or None for a new chat"""
+        if not self.turns and not self.summary:
+            return None
+
+        lines = []
+        if self.summary:
+            lines.append("Earlier:")
+            lines += [f"- {line}" for line in self.summary]
+        for turn in self.turns:
+            lines.append(f"Customer: {_clip(turn['question'])}")
+            lines.append(f"You: {_clip(turn['answer'])}")
+        return "\n".join(lines)
+
+    def add_turn(self, question, answer, topic=None):
+        """Record a turn, compacting the oldest ones into the summary"""
+        self.turns.append({"question": question, "answer": answer, "topic": topic, "time": time.time()})
+
+        while len(self.turns) > MAX_TURNS:
+            old = self.turns.pop(0)
+            label = f"[{old['topic']}] " if old.get("topic") else ""
+            self.summary.append(
+                f"{label}Customer: {_first_sentence(old['question'])} / You: {_first_sentence(old['answer'])}"
+            )
+        self.summary = self.summary[-MAX_SUMMARY_LINES:]
+
+    def save(self):
+        """Persist the chat and prune expired/excess ones (best effort)"""
+        try:
+            os.makedirs(CONVERSATIONS_DIR, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "key": self.key,
+                    "turns": self.turns,
+                    "summary": self.summary,
+                }, f)
+            os.replace(tmp_path, self.path)
+            prune()
+        except Exception:
+            pass
+
+
+def _stored_paths():
+    """Stored chat files, most recently used first"""
+    try:
+        names = [n for n in os.listdir(CONVERSATIONS_DIR) if n.endswith(".json")]
+    except OSError:
+        return []
+    paths = [os.path.join(CONVERSATIONS_DIR, n) for n in names]
+    return sorted(paths, key=lambda p: os.path.getmtime(p), reverse=True)
+
+
+def _load(path):
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        return Conversation(data["key"], data)
+    except (json.JSONDecodeError, IOError, KeyError):
+        return None
+
+
+def prune():
+    """Drop chats idle for longer than the TTL, and the oldest beyond MAX_CONVERSATIONS"""
+    cutoff = time.time() - CONVERSATION_TTL
+    for n, path in enumerate(_stored_paths()):
+        try:
+            if n >= MAX_CONVERSATIONS or os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def load_conversation(name):
+    """The chat stored under an explicit name (a new one if there is none yet)"""
+    key = "c-" + re.sub(r"[^A-Za-z0-9_-]+", "-", name)[:40]
+    path = os.path.join(CONVERSATIONS_DIR, f"{key}.json")
+    if not os.path.exists(path) or os.path.getmtime(path) < time.time() - CONVERSATION_TTL:
+        return Conversation(key)
+    return _load(path) or Conversation(key)
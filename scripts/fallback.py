@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+FAQ-snippet fallback for the reply pipeline
+When the model is slow or down, the rep gets the canned FAQ answer that best
+matches the question (the same text ;moq, ;terms etc. insert) marked
+[REVIEW], instead of waiting out the timeout for an "Error: ..." string.
+
+Snippets are read from match/faq.yml and searched with the KB's BM25 index,
+one section per trigger.
+
+Usage: python3 fallback.py "question"
+  - Show the snippet a question would fall back to
+"""
+
+import json
+import os
+import re
+import sys
+
+from kb_index import KnowledgeIndex, tokenize
+from utils import PROJECT_DIR
+
+SNIPPETS_PATH = os.path.join(PROJECT_DIR, "match", "faq.yml")
+
+# Below this BM25 score no snippet is a safe guess; the rep gets the
+# "let me check" reply instead
+MIN_SCORE = 1.5
+
+# A snippet that shares only one term with the question ("delivery") needs a
+# much stronger match than that, e.g. a rare term like "moq" or "ddp"
+MIN_TERMS = 2
+MIN_SINGLE_TERM_SCORE = 3.0
+
+# build_matches.py writes every value as a JSON-quoted string
+_TRIGGER = re.compile(r'^\s*- trigger:\s*(".*")\s*$')
+_REPLACE = re.compile(r'^\s*replace:\s*(".*")\s*$')
+_DESCRIPTION = re.compile(r"^\s*#\s*(;\S+) - (.+?)\s*$")
+
+
+def parse_snippets(text):
+    """
+    Static snippets from a generated Espanso match file (script triggers skipped)
+    Returns list of (trigger, description, text)
+    """
+    descriptions = {}
+    snippets = []
+    trigger = None
+    for line in text.split("\n"):
+        match = _DESCRIPTION.match(line)
+        if match:
+            descriptions[match.group(1)] = match.group(2)
+            continue
+        match = _TRIGGER.match(line)
+        if match:
+            trigger = json.loads(match.group(1))
+            continue
+        match = _REPLACE.match(line)
+        if match and trigger:
+            replace = json.loads(match.group(1))
+            if "{{output}}" not in replace:
+                snippets.append((trigger, descriptions.get(trigger, ""), replace.replace("{{log}}", "").strip()))
+            trigger = None
+    return snippets
+
+
+class SnippetIndex(KnowledgeIndex):
+    """KnowledgeIndex over FAQ snippets; section ids are triggers without the ';'"""
+
+    def __init__(self, path=SNIPPETS_PATH):
+        self.snippets = {}  # section id -> (trigger, text)
+        super().__init__(path)
+
+    def split(self, text):
+        sections = []
+        for trigger, description, body in parse_snippets(text):
+            section_id = trigger.lstrip(";")
+            self.snippets[section_id] = (trigger, body)
+            # The description says what the snippet answers; count it twice
+            sections.append((section_id, description or trigger, f"{section_id} {description}\n{description}\n{body}"))
+        return sections
+
+
+def find_snippet(question, path=SNIPPETS_PATH):
+    """Best matching FAQ snippet as (trigger, text), or None"""
+    index = SnippetIndex(path)
+    if index.refresh() is None:
+        return None
+    results = index.search(question, k=1)
+    if not results:
+        return None
+    section_id, score = results[0]
+    matched = set(tokenize(question)) & set(index.sections[section_id]["tf"])
+    if score < (MIN_SCORE if len(matched) >= MIN_TERMS else MIN_SINGLE_TERM_SCORE):
+        return None
+    return index.snippets[section_id]
+
+
+def fallback_result(question, reason, metrics=None):
+    """
+    Reply pipeline result (see reply.answer_question) built from the best FAQ snippet
+    reason: "timeout" or "error"; recorded with the matched trigger in metrics
+    """
+    import guardrails
+
+    metrics = dict(metrics or {})
+    metrics["fallback"] = reason
+
+    snippet = find_snippet(question)
+    if snippet:
+        trigger, reply = snippet
+        metrics["fallback_trigger"] = trigger
+        confidence = "MEDIUM"
+    else:
+        reply = guardrails.load_rules()[2]
+        confidence = "LOW"
+
+    return {
+        "reply": reply,
+        "confidence": confidence,
+        "topic": None,
+        "parts": [],
+        "cached": False,
+        "metrics": metrics,
+    }
+
+
+def main():
+    question = " ".join(sys.argv[1:])
+    if not question:
+        print("Usage: fallback.py \"question\"", file=sys.stderr)
+        sys.exit(1)
+
+    snippet = find_snippet(question)
+    if snippet:
+        print(f"{snippet[0]}\n\n{snippet[1]}")
+    else:
+        print("No snippet matches (would reply with the safe \"let me check\" message)")
+
+
+if __name__ == "__main__":
+    main()
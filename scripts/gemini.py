@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Gemini API client for BSD Sales Copilot
+Shared generateContent call plus context caching for static prompt prefixes
+
+The persona/rules + knowledge base are identical on every ;reply, so they are
+uploaded once as a cachedContents resource and reused until the TTL expires.
+Per-request calls then only send the customer message.
+"""
+
+import base64
+import http.client
+import urllib.error
+import urllib.parse
+import hashlib
+import json
+import os
+import threading
+import time
+
+from utils import span
+
+API_BASE = "https://generativelanguage.googleapis.com/v1beta"
+
+# Local record of live cachedContents resources (name + expiry per prefix)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, ".cache")
+CONTEXT_CACHE_FILE = os.path.join(CACHE_DIR, "context_cache.json")
+
+# How long a cached prefix lives on Gemini's side
+CONTEXT_CACHE_TTL = 3600
+
+# Refresh a cache this many seconds before it expires
+CONTEXT_CACHE_MARGIN = 60
+
+# If the API refuses to cache a prefix (e.g. too few tokens), don't retry for this long
+CONTEXT_CACHE_RETRY_AFTER = 6 * 3600
+
+
+def _connection(parts, timeout):
+    """
+    HTTPS connection for a URL, tunnelled through the HTTPS proxy urllib
+    would use (HTTPS_PROXY / system settings, honouring no_proxy)
+    """
+    import urllib.request
+
+    proxy = urllib.request.getproxies().get("https")
+    if not proxy or urllib.request.proxy_bypass(parts.hostname):
+        return http.client.HTTPSConnection(parts.netloc, timeout=timeout)
+
+    proxy_parts = urllib.parse.urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+    headers = {}
+    if proxy_parts.username:
+        credentials = f"{urllib.parse.unquote(proxy_parts.username)}:{urllib.parse.unquote(proxy_parts.password or '')}"
+        headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode("utf-8")).decode("ascii")
+
+    conn = http.client.HTTPSConnection(proxy_parts.hostname, proxy_parts.port or 80, timeout=timeout)
+    conn.set_tunnel(parts.hostname, parts.port or 443, headers=headers)
+    return conn
+
+
+def _post(url, body, timeout):
+    """
+    POST JSON and return the decoded JSON response
+    Connect and model wait are timed separately; raises HTTPError on non-2xx
+    (including redirects - the API doesn't redirect, and urllib wouldn't
+    re-send a POST body either)
+    """
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path + ("?" + parts.query if parts.query else "")
+    payload = json.dumps(body).encode("utf-8")
+
+    conn = _connection(parts, timeout)
+    try:
+        with span("http_connect"):
+            conn.connect()
+        with span("model_wait"):
+            conn.request("POST", path, body=payload, headers={"Content-Type": "application/json"})
+            response = conn.getresponse()
+            data = response.read()
+    finally:
+        conn.close()
+
+    if response.status >= 300:
+        raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+
+    with span("parse"):
+        return json.loads(data.decode("utf-8"))
+
+
+def _load_cache_state():
+    """Read the local context cache index"""
+    if not os.path.exists(CONTEXT_CACHE_FILE):
+        return {}
+    try:
+        with open(CONTEXT_CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return {}
+
+
+def _save_cache_state(state):
+    """Write the local context cache index (best effort)"""
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        tmp_path = f"{CONTEXT_CACHE_FILE}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, CONTEXT_CACHE_FILE)
+    except Exception:
+        pass
+
+
+def prefix_key(model, system_prompt):
+    """Stable key for a (model, static prefix) pair"""
+    digest = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:32]
+    return f"{model}:{digest}"
+
+
+def get_cached_context(model, system_prompt, api_key, ttl=CONTEXT_CACHE_TTL):
+    """
+    Return the cachedContents name for this prefix, creating it if needed
+    Returns None if caching is unavailable (caller sends the prefix inline)
+    """
+    key = prefix_key(model, system_prompt)
+    state = _load_cache_state()
+    now = time.time()
+
+    # Drop expired records so the file doesn't grow forever
+    state = {k: v for k, v in state.items() if v.get("expires", 0) > now}
+
+    record = state.get(key)
+    if record:
+        if record.get("unsupported"):
+            return None
+        if record["expires"] - CONTEXT_CACHE_MARGIN > now:
+            return record["name"]
+
+    url = f"{API_BASE}/cachedContents?key={api_key}"
+    body = {
+        "model": f"models/{model}",
+        "displayName": f"bsd-copilot-{key.split(':')[1][:12]}",
+        "systemInstruction": {"parts": [{"text": system_prompt}]},
+        "ttl": f"{ttl}s",
+    }
+
+    try:
+        result = _post(url, body, timeout=30)
+        state[key] = {"name": result["name"], "expires": now + ttl}
+    except urllib.error.HTTPError as e:
+        # 400 usually means the prefix is below the model's minimum cacheable size
+        if e.code == 400:
+            state[key] = {"unsupported": True, "expires": now + CONTEXT_CACHE_RETRY_AFTER}
+        _save_cache_state(state)
+        return None
+    except Exception:
+        return None
+
+    _save_cache_state(state)
+    return state[key]["name"]
+
+
+def forget_cached_context(model, system_prompt):
+    """Drop a cache record (e.g. after the server reports it missing)"""
+    key = prefix_key(model, system_prompt)
+    state = _load_cache_state()
+    if state.pop(key, None) is not None:
+        _save_cache_state(state)
+
+
+def parse_usage(result):
+    """Extract token counts from a generateContent response"""
+    usage = result.get("usageMetadata", {})
+    return {
+        "prompt_tokens": usage.get("promptTokenCount", 0),
+        "cached_tokens": usage.get("cachedContentTokenCount", 0),
+        "output_tokens": usage.get("candidatesTokenCount", 0),
+    }
+
+
+def generate_content(model, api_key, user_text, system_prompt=None,
+                     use_cache=True, timeout=30, max_retries=3):
+    """
+    Call generateContent for a single user turn
+    The static system prompt is served from a context cache when possible
+
+    Returns tuple of (text, usage) - text starts with "Error:" on failure
+    """
+    url = f"{API_BASE}/models/{model}:generateContent?key={api_key}"
+
+    cached_name = None
+    if system_prompt and use_cache:
+        cached_name = get_cached_context(model, system_prompt, api_key)
+
+    data = {"contents": [{"role": "user", "parts": [{"text": user_text}]}]}
+    if cached_name:
+        data["cachedContent"] = cached_name
+    elif system_prompt:
+        data["systemInstruction"] = {"parts": [{"text": system_prompt}]}
+
+    usage = {"prompt_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+
+    for attempt in range(max_retries):
+        try:
+            result = _post(url, data, timeout=timeout)
+            usage = parse_usage(result)
+            return result["candidates"][0]["content"]["parts"][0]["text"], usage
+        except urllib.error.HTTPError as e:
+            if cached_name and e.code in (400, 403, 404):
+                # Cache expired or was deleted server-side - resend prefix inline
+                forget_cached_context(model, system_prompt)
+                cached_name = None
+                data.pop("cachedContent", None)
+                data["systemInstruction"] = {"parts": [{"text": system_prompt}]}
+                continue
+            if e.code == 429 and attempt < max_retries - 1:
+                time.sleep(2)
+                continue
+            return f"Error: {e.code} - {e.reason}", usage
+        except Exception as e:
+            return f"Error: {str(e)}", usage
+
+    return "Error: Rate limited. Please try again in a moment.", usage
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Output guardrails for BSD Sales Copilot
+Scans model replies for known failure modes (price/discount leaks, internal
+notes, mentioning the knowledge base, invented emails) and downgrades or
+blocks them - so safety doesn't depend on ever-longer prompts
+
+All rules are compiled into one alternation regex, so a reply is checked in a
+single pass regardless of how many rules there are. Rules with "allow_known"
+skip matches that appear verbatim in the knowledge base (a price the KB
+itself quotes isn't a leak).
+"""
+
+import json
+import os
+import re
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SCRIPT_DIR)
+RULES_PATH = os.path.join(PROJECT_DIR, "knowledge", "guardrails.json")
+
+# Most severe first - the worst matching rule decides the outcome
+ACTIONS = ("block", "needs_info", "review")
+
+DEFAULT_SAFE_REPLY = "Hi there, great question! Let me check with the team on that and get back to you."
+
+_compiled = {}  # rules path -> (pattern, {group: rule}, safe_reply)
+
+
+def load_rules(path=RULES_PATH):
+    """
+    Compile rules file into a single regex (cached per process)
+    Returns (pattern, rules_by_group, safe_reply); pattern is None if no rules
+    """
+    if path in _compiled:
+        return _compiled[path]
+
+    rules, safe_reply = [], DEFAULT_SAFE_REPLY
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+            rules = data.get("rules", [])
+            safe_reply = data.get("safe_reply", DEFAULT_SAFE_REPLY)
+        except (json.JSONDecodeError, IOError):
+            pass
+
+    by_group = {}
+    parts = []
+    for i, rule in enumerate(rules):
+        if rule.get("action") not in ACTIONS:
+            continue
+        try:
+            re.compile(rule["pattern"])
+        except (re.error, KeyError):
+            continue  # One bad rule shouldn't disable the rest
+        group = f"r{i}"
+        by_group[group] = rule
+        parts.append(f"(?P<{group}>{rule['pattern']})")
+
+    pattern = re.compile("|".join(parts), re.IGNORECASE) if parts else None
+    _compiled[path] = (pattern, by_group, safe_reply)
+    return _compiled[path]
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+def scan(reply, path=RULES_PATH, known=None):
+    """
+    Find rule hits in a reply
+    known: knowledge base text, for rules with "allow_known"
+    Returns (worst_action or None, list of rule ids hit)
+    """
+    pattern, by_group, _ = load_rules(path)
+    if pattern is None or not reply:
+        return None, []
+
+    hits = []
+    worst = None
+    known_text = None
+    for match in pattern.finditer(reply):
+        rule = by_group[match.lastgroup]
+        if rule.get("allow_known") and known:
+            if known_text is None:
+                known_text = _normalize(known)
+            # Whole amount only: the KB's "$500" doesn't allow "$5"
+            if re.search(re.escape(_normalize(match.group())) + r"(?![\d]|[.,]\d)", known_text):
+                continue
+        if rule["id"] not in hits:
+            hits.append(rule["id"])
+        if worst is None or ACTIONS.index(rule["action"]) < ACTIONS.index(worst):
+            worst = rule["action"]
+
+    return worst, hits
+
+
+def apply(reply, confidence, path=RULES_PATH, known=None):
+    """
+    Enforce guardrails on a parsed reply
+    known: knowledge base text (see scan)
+    Returns tuple of (reply, confidence, rule ids hit)
+    """
+    action, hits = scan(reply, path, known)
+
+    if action == "block":
+        return load_rules(path)[2], "LOW", hits
+    if action == "needs_info":
+        return reply, "LOW", hits
+    if action == "review" and confidence == "HIGH":
+        return reply, "MEDIUM", hits
+
+    return reply, confidence, hits
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Keep-alive HTTP connections for the background sync jobs
+One connection per host is reused across requests (and across jobs when the
+scheduler runs them in the same wakeup), instead of a new TLS handshake per file/row
+
+Errors are raised as urllib's HTTPError/URLError so callers can keep their
+existing exception handling.
+"""
+
+import http.client
+import io
+import threading
+import urllib.parse
+from urllib.error import HTTPError, URLError
+
+
+class ConnectionPool:
+    """Reuses one HTTP(S) connection per (scheme, host)"""
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self._conns = {}
+        self._lock = threading.Lock()
+
+    def _get(self, scheme, netloc, timeout):
+        key = (scheme, netloc)
+        with self._lock:
+            conn = self._conns.get(key)
+            if conn is None:
+                cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+                conn = cls(netloc, timeout=timeout)
+                self._conns[key] = conn
+            return conn
+
+    def _drop(self, scheme, netloc):
+        with self._lock:
+            conn = self._conns.pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def open(self, method, url, body=None, headers=None, timeout=None):
+        """
+        Send a request and return the response unread, for streaming large bodies
+        Read it to the end before making the next request to the same host
+        """
+        parts = urllib.parse.urlsplit(url)
+        path = parts.path + ("?" + parts.query if parts.query else "")
+        timeout = timeout or self.timeout
+
+        for attempt in range(2):
+            conn = self._get(parts.scheme, parts.netloc, timeout)
+            conn.timeout = timeout
+            try:
+                conn.request(method, path or "/", body=body, headers=headers or {})
+                response = conn.getresponse()
+                break
+            except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError) as e:
+                self._drop(parts.scheme, parts.netloc)
+                if attempt == 1:
+                    raise URLError(e)
+            except OSError as e:
+                self._drop(parts.scheme, parts.netloc)
+                raise URLError(e)
+
+        # The response keeps its own reference to the socket, so it stays readable
+        if response.getheader("Connection", "").lower() == "close":
+            self._drop(parts.scheme, parts.netloc)
+
+        if response.status >= 400:
+            # Error body stays readable (PostgREST says which column it rejected)
+            raise HTTPError(url, response.status, response.reason, response.headers, io.BytesIO(response.read()))
+
+        return response
+
+    def request(self, method, url, body=None, headers=None, timeout=None):
+        """
+        Send a request, reconnecting once if the kept-alive socket went stale
+        Returns tuple of (status, headers, body_bytes) for 2xx/3xx responses
+        """
+        response = self.open(method, url, body, headers, timeout)
+        try:
+            data = response.read()
+        except OSError as e:
+            self._drop(*urllib.parse.urlsplit(url)[:2])
+            raise URLError(e)
+        return response.status, response.headers, data
+
+    def close(self):
+        """Close all pooled connections"""
+        with self._lock:
+            conns, self._conns = list(self._conns.values()), {}
+        for conn in conns:
+            conn.close()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Named knowledge base collections for BSD Sales Copilot
+Lets the team keep several KBs (per-market terms, shipping, documents) next
+to the core FAQ, each with its own persisted section index. A question is
+only answered from the collections it needs: picked by keywords in the
+question, or named explicitly by a trigger (e.g. ;reply-eu -> --kb eu).
+Indexes are loaded on first use, so unrelated collections never hit memory.
+
+Config (config.json):
+  "knowledge_bases": {
+    "faq": {"path": "knowledge/faq.md", "always": true},
+    "eu": {"path": "knowledge/markets/eu.md", "title": "EU market",
+           "keywords": ["europe", "eu", "rotterdam", "vat"]}
+  }
+
+Usage: python3 kb_collections.py [--route "question"]
+  - No args: refresh + save the index of every collection (precompile)
+  - --route: show which collections a question would use
+"""
+
+import os
+import sys
+import threading
+
+from kb_index import KnowledgeIndex, tokenize, reindex
+from utils import PROJECT_DIR, load_config, get_knowledge_base_path
+
+# The original single KB; its section ids are left unprefixed so existing
+# cached responses stay valid
+DEFAULT_COLLECTION = "faq"
+
+
+def qualify(name, section_id):
+    """Collection-qualified section id ("eu/vat-registration")"""
+    return section_id if name == DEFAULT_COLLECTION else f"{name}/{section_id}"
+
+
+def get_collection_specs(config):
+    """
+    {name: {path, title, keywords, always}} from config
+    Without "knowledge_bases" this is just the core FAQ
+    """
+    specs = {}
+    for name, spec in (config.get("knowledge_bases") or {}).items():
+        path = spec.get("path") or ""
+        specs[name] = {
+            "path": path if os.path.isabs(path) else os.path.join(PROJECT_DIR, path),
+            "title": spec.get("title") or name,
+            "keywords": spec.get("keywords", []),
+            "always": bool(spec.get("always", False)),
+        }
+
+    # The core FAQ comes first unless configured otherwise
+    if DEFAULT_COLLECTION not in specs:
+        specs = {
+            DEFAULT_COLLECTION: {
+                "path": get_knowledge_base_path(),
+                "title": DEFAULT_COLLECTION,
+                "keywords": [],
+                "always": True,
+            },
+            **specs,
+        }
+    return specs
+
+
+def _mentions(words, keyword):
+    """True if every word of a (possibly multi-word) keyword is in the question"""
+    terms = tokenize(keyword)
+    return bool(terms) and set(terms) <= words
+
+
+class KnowledgeSet:
+    """
+    Several collection indexes behind the KnowledgeIndex interface used by
+    the reply pipeline and response cache (text, refresh, search,
+    section_hashes, is_current, last_updated). Section ids are qualified
+    by collection.
+    """
+
+    def __init__(self, indexes, titles=None):
+        self.indexes = indexes  # [(name, KnowledgeIndex)]
+        self.titles = titles or {}
+
+    @property
+    def names(self):
+        return [name for name, _ in self.indexes]
+
+    @property
+    def text(self):
+        """Prompt context: a lone KB as-is, several under their own headings"""
+        loaded = [(name, index.text) for name, index in self.indexes if index.text]
+        if len(loaded) <= 1:
+            return loaded[0][1] if loaded else None
+        return "\n\n".join(f"# {self.titles.get(name, name)}\n\n{text}" for name, text in loaded)
+
+    @property
+    def last_updated(self):
+        return max((index.last_updated for _, index in self.indexes), default=0)
+
+    def refresh(self):
+        """Qualified ids of changed sections; None if no collection's file exists"""
+        changed = set()
+        found = False
+        for name, index in self.indexes:
+            result = index.refresh()
+            if result is None:
+                continue
+            found = True
+            changed |= {qualify(name, section_id) for section_id in result}
+        return changed if found else None
+
+    def save(self):
+        for _, index in self.indexes:
+            index.save()
+
+    def search(self, query, k=3):
+        results = [
+            (qualify(name, section_id), score)
+            for name, index in self.indexes
+            for section_id, score in index.search(query, k)
+        ]
+        results.sort(key=lambda r: r[1], reverse=True)
+        return results[:k]
+
+    def _split(self, qualified_id):
+        """(index, section_id) for a qualified id, or (None, None)"""
+        name, sep, section_id = qualified_id.partition("/")
+        if not sep:
+            name, section_id = DEFAULT_COLLECTION, qualified_id
+        for index_name, index in self.indexes:
+            if index_name == name:
+                return index, section_id
+        return None, None
+
+    def _section_field(self, section_ids, field):
+        values = {}
+        for qualified_id in section_ids:
+            index, section_id = self._split(qualified_id)
+            if index is not None and section_id in index.sections:
+                values[qualified_id] = index.sections[section_id][field]
+        return values
+
+    def section_hashes(self, section_ids):
+        return self._section_field(section_ids, "hash")
+
+    def section_titles(self, section_ids):
+        return self._section_field(section_ids, "title")
+
+    def is_current(self, deps):
+        for qualified_id, digest in deps.items():
+            index, section_id = self._split(qualified_id)
+            if index is None or index.sections.get(section_id, {}).get("hash") != digest:
+                return False
+        return True
+
+
+class KnowledgeCollections:
+    """Routes questions to collections and loads their indexes on first use"""
+
+    def __init__(self, config):
+        self.specs = get_collection_specs(config)
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def pick(self, question, names=None):
+        """
+        Collections for a question: every "always" collection, plus the
+        explicitly named ones (trigger suffix) or those whose keywords appear
+        """
+        picked = [name for name, spec in self.specs.items() if spec["always"]]
+
+        if names:
+            unknown = [name for name in names if name not in self.specs]
+            if unknown:
+                raise ValueError(f"Unknown knowledge base: {', '.join(unknown)}")
+            wanted = set(names)
+        else:
+            words = set(tokenize(question))
+            wanted = {
+                name for name, spec in self.specs.items()
+                if any(_mentions(words, keyword) for keyword in spec["keywords"])
+            }
+
+        # Keep config order so the prompt prefix (and its context cache) is stable
+        return [name for name in self.specs if name in wanted or name in picked]
+
+    def index(self, name):
+        with self._lock:
+            if name not in self._indexes:
+                self._indexes[name] = KnowledgeIndex(self.specs[name]["path"])
+            return self._indexes[name]
+
+    def get(self, names):
+        """KnowledgeSet over the named collections (indexes loaded lazily)"""
+        return KnowledgeSet(
+            [(name, self.index(name)) for name in names],
+            {name: self.specs[name]["title"] for name in names},
+        )
+
+    def load(self, question, names=None):
+        """Pick + load + refresh the collections for a question"""
+        kb = self.get(self.pick(question, names))
+        if kb.refresh():
+            kb.save()
+        return kb
+
+
+def reindex_path(kb_path, config=None):
+    """
+    Re-index the collection stored at kb_path (after a sync update),
+    dropping cached responses that depended on its changed sections
+    Returns set of changed (qualified) section ids
+    """
+    specs = get_collection_specs(config or load_config())
+    target = os.path.abspath(kb_path)
+    for name, spec in specs.items():
+        if os.path.abspath(spec["path"]) == target:
+            return reindex(kb_path, prefix=qualify(name, ""))
+    return reindex(kb_path)
+
+
+def main():
+    collections = KnowledgeCollections(load_config())
+
+    if "--route" in sys.argv:
+        question = " ".join(sys.argv[sys.argv.index("--route") + 1:])
+        print(", ".join(collections.pick(question)))
+        return
+
+    for name, spec in collections.specs.items():
+        changed = reindex(spec["path"], prefix=qualify(name, ""))
+        print(f"{name:12} {spec['path']}: {len(changed)} section(s) changed")
+
+
+if __name__ == "__main__":
+    main()
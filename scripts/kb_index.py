@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Knowledge base index for BSD Sales Copilot
+Splits knowledge/faq.md into ### sections, hashes each one and keeps a
+small BM25 keyword index over them
+
+Edits are picked up incrementally: only sections whose hash changed are
+re-tokenized, and only cached responses that depended on those sections
+are invalidated.
+
+Usage: python3 kb_index.py [--watch] [--search "question"]
+  - No args: refresh the index once and print what changed
+  - --watch: keep running, picking up KB edits within a second
+  - --search: show the best matching sections for a question
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, ".cache")
+
+# Poll interval for --watch (seconds)
+WATCH_INTERVAL = 0.5
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = frozenset("""
+a an and are as at be but by can could do does for from had has have how i if in
+into is it its me my no not of on or our so than that the their them then there
+these they this to us was we what when where which who why will with would you your
+""".split())
+
+# Words this short are noise ("s" from "what's", "x" from "1 x 40ft"), except
+# trade acronyms a question can hinge on
+SHORT_TERMS = frozenset("bl ci eu hc lc pf pl uk".split())
+
+# Contraction suffixes ("what's", "don't", "we're"); straight or curly apostrophe
+_CONTRACTION = re.compile(r"n?['\u2019]t\b|['\u2019](s|re|ve|ll|d|m)\b")
+
+# Bump when tokenize() changes, so persisted indexes are rebuilt
+INDEX_VERSION = 2
+
+
+def tokenize(text):
+    """Lowercase word tokens, stopwords and short words dropped, naive plural stripping"""
+    tokens = []
+    for word in re.findall(r"[a-z0-9]+", _CONTRACTION.sub("", text.lower())):
+        if word in STOPWORDS or (len(word) < 3 and word not in SHORT_TERMS):
+            continue
+        if len(word) > 4 and word.endswith("s") and not word.endswith("ss"):
+            word = word[:-1]
+        tokens.append(word)
+    return tokens
+
+
+def _slug(title):
+    return re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-") or "section"
+
+
+def split_sections(text):
+    """
+    Split markdown into sections at ### headings
+    Content before the first ### is kept as a "preamble" section
+    Returns list of (section_id, title, body)
+    """
+    sections = []
+    seen = {}
+    title, lines = "Preamble", []
+
+    def flush():
+        body = "\n".join(lines).strip()
+        if body:
+            section_id = _slug(title)
+            seen[section_id] = seen.get(section_id, 0) + 1
+            if seen[section_id] > 1:
+                section_id = f"{section_id}-{seen[section_id]}"
+            sections.append((section_id, title, body))
+
+    for line in text.split("\n"):
+        if line.startswith("### "):
+            flush()
+            title, lines = line[4:].strip(), [line]
+        else:
+            lines.append(line)
+    flush()
+
+    return sections
+
+
+def default_index_path(kb_path):
+    """Per-KB index file under .cache/"""
+    digest = hashlib.sha1(os.path.abspath(kb_path).encode("utf-8")).hexdigest()[:10]
+    return os.path.join(CACHE_DIR, f"kb_index-{digest}.json")
+
+
+class KnowledgeIndex:
+    """
+    Section-level index over one knowledge base file
+    Cheap to keep fresh: refresh() is a stat() call unless the file changed
+    """
+
+    def __init__(self, kb_path, index_path=None):
+        self.kb_path = kb_path
+        self.index_path = index_path or default_index_path(kb_path)
+        self.text = None
+        self.sections = {}  # id -> {title, hash, body, tf, length, updated}
+        self._stat = None
+        self._df = {}
+        self._avg_length = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        """Load the persisted index (sections are re-validated on refresh)"""
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r") as f:
+                data = json.load(f)
+            # Sections tokenized differently are re-indexed on refresh
+            if data.get("version") == INDEX_VERSION:
+                self.sections = data.get("sections", {})
+        except (json.JSONDecodeError, IOError):
+            self.sections = {}
+        self._rebuild_stats()
+
+    def save(self):
+        """Persist the index (best effort)"""
+        try:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"version": INDEX_VERSION, "kb_path": self.kb_path, "sections": self.sections}, f)
+            os.replace(tmp_path, self.index_path)
+        except Exception:
+            pass
+
+    def _rebuild_stats(self):
+        """Document frequencies + average length for BM25"""
+        df = {}
+        total = 0
+        for section in self.sections.values():
+            total += section["length"]
+            for term in section["tf"]:
+                df[term] = df.get(term, 0) + 1
+        self._df = df
+        self._avg_length = total / len(self.sections) if self.sections else 0
+
+    def split(self, text):
+        """(section_id, title, body) per section - subclasses index other formats"""
+        return split_sections(text)
+
+    def refresh(self):
+        """
+        Re-read the KB if it changed on disk, re-indexing only edited sections
+        Returns set of changed section ids (added, edited or removed) -
+        empty if nothing changed. None if the KB file is missing.
+        """
+        with self._lock:
+            try:
+                st = os.stat(self.kb_path)
+            except OSError:
+                return None
+
+            stat_key = (st.st_mtime_ns, st.st_size)
+            if stat_key == self._stat and self.text is not None:
+                return set()
+
+            with open(self.kb_path, "r") as f:
+                text = f.read()
+
+            now = time.time()
+            changed = set()
+            sections = {}
+            for section_id, title, body in self.split(text):
+                digest = hashlib.sha256(body.encode("utf-8")).hexdigest()[:16]
+                old = self.sections.get(section_id)
+                if old and old["hash"] == digest:
+                    sections[section_id] = old
+                    continue
+
+                tokens = tokenize(body)
+                tf = {}
+                for token in tokens:
+                    tf[token] = tf.get(token, 0) + 1
+                sections[section_id] = {
+                    "title": title,
+                    "hash": digest,
+                    "body": body,
+                    "tf": tf,
+                    "length": len(tokens),
+                    "updated": now,
+                }
+                changed.add(section_id)
+
+            changed |= set(self.sections) - set(sections)
+
+            self.text = text
+            self._stat = stat_key
+            if changed:
+                self.sections = sections
+                self._rebuild_stats()
+            return changed
+
+    @property
+    def last_updated(self):
+        """Most recent time any section was added or edited"""
+        return max((s["updated"] for s in self.sections.values()), default=0)
+
+    def search(self, query, k=3):
+        """
+        BM25 search over sections
+        Returns list of (section_id, score), best first, score > 0 only
+        """
+        # One consistent view, even while a batch thread runs refresh()
+        with self._lock:
+            sections, doc_freq, avg_length = self.sections, self._df, self._avg_length
+
+        terms = set(tokenize(query))
+        if not terms or not sections:
+            return []
+
+        n = len(sections)
+        scores = []
+        for section_id, section in sections.items():
+            score = 0.0
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * section["length"] / (avg_length or 1))
+            for term in terms:
+                tf = section["tf"].get(term)
+                if not tf:
+                    continue
+                df = doc_freq.get(term, 0)
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+            if score > 0:
+                scores.append((section_id, score))
+
+        scores.sort(key=lambda s: s[1], reverse=True)
+        return scores[:k]
+
+    def section_hashes(self, section_ids):
+        """Current hash for each section id (for cache dependency tracking)"""
+        return {i: self.sections[i]["hash"] for i in section_ids if i in self.sections}
+
+    def is_current(self, deps):
+        """True if every {section_id: hash} dependency is unchanged"""
+        return all(
+            self.sections.get(section_id, {}).get("hash") == digest
+            for section_id, digest in deps.items()
+        )
+
+
+def reindex(kb_path, index=None, prefix=""):
+    """
+    Refresh + persist the index for a KB and drop cached responses
+    that depended on changed sections
+    prefix: collection qualifier for section ids in the cache ("eu/")
+    Returns set of changed section ids
+    """
+    from response_cache import ResponseCache
+
+    index = index or KnowledgeIndex(kb_path)
+    changed = index.refresh()
+    if changed:
+        index.save()
+        cache = ResponseCache()
+        if cache.invalidate({prefix + section_id for section_id in changed}):
+            cache.save()
+    return changed or set()
+
+
+def watch(kb_path, interval=WATCH_INTERVAL):
+    """Keep the index fresh, picking up edits within `interval` seconds"""
+    index = KnowledgeIndex(kb_path)
+    print(f"Watching {kb_path} (every {interval}s)")
+    while True:
+        changed = reindex(kb_path, index)
+        if changed:
+            print(f"[{time.strftime('%H:%M:%S')}] Re-indexed {len(changed)} section(s): {', '.join(sorted(changed))}")
+        time.sleep(interval)
+
+
+def main():
+    from utils import get_knowledge_base_path
+
+    kb_path = get_knowledge_base_path()
+
+    if "--watch" in sys.argv:
+        try:
+            watch(kb_path)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if "--search" in sys.argv:
+        query = " ".join(sys.argv[sys.argv.index("--search") + 1:])
+        index = KnowledgeIndex(kb_path)
+        index.refresh()
+        for section_id, score in index.search(query, k=5):
+            print(f"{score:6.2f}  {index.sections[section_id]['title']}")
+        return
+
+    changed = reindex(kb_path)
+    print(f"{len(changed)} section(s) changed" + (f": {', '.join(sorted(changed))}" if changed else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -8,12 +8,13 @@ Background sync process pushes to Supabase
 import json
 import os
 import fcntl
-from datetime import datetime
+import time
 
 # Log file location
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 LOG_DIR = os.path.join(SCRIPT_DIR, ".logs")
 LOG_FILE = os.path.join(LOG_DIR, "usage.jsonl")
+FAILED_FILE = os.path.join(LOG_DIR, "failed.jsonl")
 
 
 def ensure_log_dir():
@@ -22,6 +23,12 @@ def ensure_log_dir():
         os.makedirs(LOG_DIR, exist_ok=True)
 
 
+def utc_timestamp():
+    """Current UTC time as ISO 8601 ("2026-10-19T14:03:11.123456Z") without importing datetime"""
+    now = time.time()
+    return time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now)) + ".%06dZ" % (int(now * 1_000_000) % 1_000_000)
+
+
 def log_local(entry: dict):
     """
     Append a log entry to local JSONL file
@@ -34,7 +41,7 @@ def log_local(entry: dict):
 
     # Add timestamp if not present
     if "timestamp" not in entry:
-        entry["timestamp"] = datetime.utcnow().isoformat() + "Z"
+        entry["timestamp"] = utc_timestamp()
 
     try:
         with open(LOG_FILE, "a") as f:
@@ -49,17 +56,18 @@ def log_local(entry: dict):
         pass
 
 
-def read_logs():
+def read_logs(path=None):
     """
-    Read all pending log entries
+    Read all pending log entries (or the failed archive, path=FAILED_FILE)
     Returns list of dicts
     """
-    if not os.path.exists(LOG_FILE):
+    path = path or LOG_FILE
+    if not os.path.exists(path):
         return []
 
     entries = []
     try:
-        with open(LOG_FILE, "r") as f:
+        with open(path, "r") as f:
             for line in f:
                 line = line.strip()
                 if line:
@@ -73,11 +81,12 @@ def read_logs():
     return entries
 
 
-def clear_logs():
-    """Clear all pending logs after successful sync"""
+def clear_logs(path=None):
+    """Clear all pending logs (or the failed archive) after successful sync"""
+    path = path or LOG_FILE
     try:
-        if os.path.exists(LOG_FILE):
-            os.remove(LOG_FILE)
+        if os.path.exists(path):
+            os.remove(path)
     except Exception:
         pass
 
@@ -85,16 +94,15 @@ def clear_logs():
 def archive_failed_logs(entries: list):
     """
     Archive logs that failed to sync
-    Keeps them for retry on next sync
+    The next sync retries them (see sync_logs.run_sync)
     """
     if not entries:
         return
 
     ensure_log_dir()
-    archive_file = os.path.join(LOG_DIR, "failed.jsonl")
 
     try:
-        with open(archive_file, "a") as f:
+        with open(FAILED_FILE, "a") as f:
             for entry in entries:
                 f.write(json.dumps(entry) + "\n")
     except Exception:
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
 """
 Log and return static snippets for Espanso
-Usage: python3 log_snippet.py <trigger> <text>
+Usage: python3 log_snippet.py <trigger> [text]
 
-Logs the trigger usage locally, then prints the text.
+Logs the trigger usage locally, then prints the text (if given).
 Fast (~25ms) because it only writes to local file.
+
+The match files log through log_trigger.sh and fall back to this script
+(without text) on installs that don't have the helper yet.
 """
 
 import sys
@@ -15,16 +18,19 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, SCRIPT_DIR)
 
 from local_log import log_local
-from utils import load_config, get_os
+from utils import load_config, get_os, ensure_installed
 
 
 def main():
-    if len(sys.argv) < 3:
-        print("Usage: log_snippet.py <trigger> <text>", file=sys.stderr)
+    if len(sys.argv) < 2:
+        print("Usage: log_snippet.py <trigger> [text]", file=sys.stderr)
         sys.exit(1)
 
     trigger = sys.argv[1]
-    text = sys.argv[2]
+    text = sys.argv[2] if len(sys.argv) > 2 else None
+
+    # No log_trigger.sh means an install still on the original snippet sync
+    ensure_installed(wait=False)
 
     # Load config for user_id
     config = load_config()
@@ -39,7 +45,8 @@ def main():
         })
 
     # Output the text
-    print(text)
+    if text is not None:
+        print(text)
 
 
 if __name__ == "__main__":
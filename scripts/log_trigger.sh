@@ -0,0 +1,29 @@
+#!/bin/sh
+#
+# Log a static snippet trigger without starting Python
+# Usage: log_trigger.sh <trigger>
+#
+# Appends one line to the local usage log; user_id and os are filled in
+# by sync_logs.py at sync time. Prints nothing.
+#
+
+SCRIPT_DIR="$(dirname "$0")"
+CONFIG="${BSD_COPILOT_CONFIG:-$SCRIPT_DIR/config.json}"
+LOG_DIR="$SCRIPT_DIR/.logs"
+
+# "log_usage": false in config.json turns logging off, as in log_snippet.py
+if grep -Eq '"log_usage"[[:space:]]*:[[:space:]]*false' "$CONFIG" 2>/dev/null; then
+    exit 0
+fi
+
+[ -d "$LOG_DIR" ] || mkdir -p "$LOG_DIR"
+
+# Same exclusive lock as local_log.log_local (flock(1) isn't on every Mac;
+# without it the single small O_APPEND write is still not interleaved)
+(
+    command -v flock >/dev/null 2>&1 && flock -x 9
+    printf '{"type": "usage", "trigger": "%s", "timestamp": "%s"}\n' \
+        "$1" "$(date -u +%Y-%m-%dT%H:%M:%SZ)" >&9
+) 9>>"$LOG_DIR/usage.jsonl" 2>/dev/null
+
+exit 0
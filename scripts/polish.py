@@ -8,7 +8,6 @@ Usage: python3 polish.py [num_options]
   - Logs usage to Supabase (if configured)
 """
 
-import urllib.request
 import json
 import sys
 import time
@@ -18,11 +17,18 @@ from utils import (
     get_clipboard,
     load_config,
     log_usage,
+    span,
+    run_main,
+    ensure_installed,
 )
 
 
 def polish_text(text, api_key, num_options=1):
     """Send text to Gemini API for polishing"""
+    # Network modules are only loaded once there is text to send
+    import urllib.request
+    import urllib.error
+
     url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash-lite:generateContent?key={api_key}"
 
     if num_options == 1:
@@ -76,6 +82,10 @@ Text to polish:
 
 
 def main():
+    # Installs still on the original snippet sync lack modules log_usage needs;
+    # the upgrade fetches them in the background
+    ensure_installed(wait=False)
+
     # Load configuration
     config = load_config()
     api_key = config.get("gemini_api_key")
@@ -100,17 +110,21 @@ def main():
             pass
 
     # Polish the text
-    polished = polish_text(clipboard_text, api_key, num_options)
-
-    # Log usage (non-blocking)
-    log_usage(
-        trigger=f";p{num_options}",
-        question=clipboard_text,
-        config=config
-    )
+    with span("model_wait"):
+        polished = polish_text(clipboard_text, api_key, num_options)
+
+    # Log usage (non-blocking); skipped until the upgrade brings capture.py
+    try:
+        log_usage(
+            trigger=f";p{num_options}",
+            question=clipboard_text,
+            config=config
+        )
+    except ImportError:
+        pass
 
     print(polished)
 
 
 if __name__ == "__main__":
-    main()
+    run_main(main)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Multi-question messages for the reply pipeline
+Customers often paste one WhatsApp message asking several things at once
+("What are your payment terms? What's the MOQ? How long is lead time?").
+These helpers split such a message into sub-questions, point the model at
+the KB sections relevant to each one, and read back a confidence + topic
+per part, so every unanswered part becomes its own gap.
+"""
+
+import re
+
+# Split only when a message has at least this many questions...
+MIN_PARTS = 2
+# ...and no more than this (beyond that it's a pasted document, not a chat)
+MAX_PARTS = 6
+
+# KB sections suggested to the model per sub-question
+HINT_SECTIONS = 2
+
+# A sentence is a question if it ends in "?" or starts with one of these
+QUESTION_WORDS = frozenset("""
+what what's whats how how's when where which who why can could do does did
+is are will would should may shall any have has
+""".split())
+
+CONFIDENCE_ORDER = {"LOW": 0, "MEDIUM": 1, "HIGH": 2}
+
+PART_LINE = re.compile(r"^\s*PART\s+(\d+)\s*:\s*(HIGH|MEDIUM|LOW)\s*(?:\|\s*(.*))?$", re.IGNORECASE)
+
+
+def split_questions(message):
+    """
+    Sub-questions of a customer message, in order
+    Returns [] unless the message asks MIN_PARTS..MAX_PARTS distinct questions
+    """
+    parts = []
+    seen = set()
+    for sentence in re.split(r"\n+|(?<=[?.!])\s+", message):
+        sentence = sentence.strip(" -*•\t")
+        words = sentence.lower().split()
+        if len(words) < 3:
+            continue  # "Hi there," / "Thanks!"
+        if not sentence.endswith("?") and words[0].strip(",") not in QUESTION_WORDS:
+            continue
+        key = sentence.lower()
+        if key not in seen:
+            seen.add(key)
+            parts.append(sentence)
+
+    if not MIN_PARTS <= len(parts) <= MAX_PARTS:
+        return []
+    return parts
+
+
+def find_hints(parts, kb, k=HINT_SECTIONS):
+    """
+    Retrieve the best KB sections for each sub-question
+    Returns list of (part, [section_id, ...])
+    """
+    return [(part, [section_id for section_id, _ in kb.search(part, k=k)]) for part in parts]
+
+
+def build_parts_prompt(hints, titles):
+    """Extra user-prompt block asking for one merged reply + a PART line per question"""
+    lines = [f"This message asks {len(hints)} separate things:"]
+    for n, (part, section_ids) in enumerate(hints, 1):
+        see = "; ".join(titles[s] for s in section_ids if s in titles)
+        lines.append(f"{n}. {part}" + (f" (see: {see})" if see else ""))
+
+    lines += [
+        "",
+        "Answer every part in ONE reply: a single greeting, then a short line or paragraph per part.",
+        "If you are unsure about any part, use the prefix for the least confident part.",
+        "After the TOPIC line, add one line per part in this exact format:",
+        "PART <number>: HIGH|MEDIUM|LOW | short-topic-slug",
+    ]
+    return "\n".join(lines)
+
+
+def parse_parts(raw_reply, parts):
+    """
+    Strip PART lines from a reply
+    Returns tuple of (reply_without_part_lines, [{question, confidence, topic}, ...])
+    Parts the model didn't report get confidence None
+    """
+    found = {}
+    kept = []
+    for line in raw_reply.split("\n"):
+        match = PART_LINE.match(line)
+        if match:
+            topic = (match.group(3) or "").strip().lower().replace(" ", "-").strip("[]") or None
+            found[int(match.group(1))] = (match.group(2).upper(), topic)
+        else:
+            kept.append(line)
+
+    results = []
+    for n, part in enumerate(parts, 1):
+        confidence, topic = found.get(n, (None, None))
+        results.append({"question": part, "confidence": confidence, "topic": topic})
+    return "\n".join(kept).strip(), results
+
+
+def worst_confidence(*levels):
+    """Least confident of the given levels (None ignored)"""
+    levels = [level for level in levels if level]
+    return min(levels, key=CONFIDENCE_ORDER.get) if levels else None
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Release bundles for snippet sync
+A release is one tar.gz holding every synced file plus release.json (per-file
+SHA-256, size and mode), published next to a tiny pointer file
+(releases/LATEST) naming the current bundle and its SHA-256. Clients poll
+only the pointer; when it changes they download the bundle, verify it and
+swap the files in only after every one of them checked out, so a failed
+download never leaves a half-applied release.
+
+The pointer can be signed with HMAC-SHA256 ("release_key" in config.json,
+BSD_RELEASE_KEY for build_release.py); clients with a key reject unsigned
+or mis-signed pointers. This is an integrity check, not authenticity: the
+key is a shared secret baked into every install, so anyone holding one
+install can sign a LATEST the others accept. It catches a corrupted or
+hand-edited pointer (or one from the wrong repo/branch); trust in releases
+still rests on who can push to the repo.
+"""
+
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+
+RELEASES_DIR = "releases"
+POINTER_FILE = f"{RELEASES_DIR}/LATEST"
+BUNDLE_MANIFEST = "release.json"
+FORMAT_VERSION = 1
+
+CHUNK_SIZE = 64 * 1024
+
+
+def canonical(pointer):
+    """Bytes that are signed: the pointer without its signature, keys sorted"""
+    fields = {k: v for k, v in pointer.items() if k != "signature"}
+    return json.dumps(fields, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+def sign_pointer(pointer, key):
+    return hmac.new(key.encode("utf-8"), canonical(pointer), hashlib.sha256).hexdigest()
+
+
+def verify_pointer(pointer, key=None):
+    """
+    Check a pointer's format (and signature, if a key is configured)
+    Returns reason string if it must not be used, None if OK
+    """
+    if pointer.get("format") != FORMAT_VERSION:
+        return f"unsupported release format: {pointer.get('format')}"
+    for field in ("release", "created", "bundle", "sha256", "size"):
+        if field not in pointer:
+            return f"pointer is missing {field}"
+    if not key:
+        return None
+    if not pointer.get("signature"):
+        return "pointer is not signed"
+    if not hmac.compare_digest(pointer["signature"], sign_pointer(pointer, key)):
+        return "bad pointer signature"
+    return None
+
+
+def _safe_path(path):
+    """True for a plain relative path that stays inside the project"""
+    parts = path.split("/")
+    return bool(path) and not path.startswith("/") and ".." not in parts and "" not in parts and "\\" not in path
+
+
+def _file_mode(path):
+    """Modes are normalized the way git stores them"""
+    return 0o755 if os.stat(path).st_mode & 0o111 else 0o644
+
+
+def build_bundle(files, project_dir):
+    """
+    Deterministic tar.gz of the given files (sorted, zeroed times and owners),
+    so rebuilding unchanged files gives the same bytes and checksum
+    Returns tuple of (bundle_bytes, release_manifest)
+    """
+    manifest = {"format": FORMAT_VERSION, "files": {}}
+    contents = {}
+    for filepath in sorted(files):
+        path = os.path.join(project_dir, filepath)
+        with open(path, "rb") as f:
+            data = f.read()
+        contents[filepath] = data
+        manifest["files"][filepath] = {
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "size": len(data),
+            "mode": _file_mode(path),
+        }
+
+    def add(tar, name, data, mode=0o644):
+        info = tarfile.TarInfo(name)
+        info.size = len(data)
+        info.mode = mode
+        info.mtime = 0
+        tar.addfile(info, io.BytesIO(data))
+
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb", mtime=0) as gz:
+        with tarfile.open(fileobj=gz, mode="w", format=tarfile.PAX_FORMAT) as tar:
+            add(tar, BUNDLE_MANIFEST, json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+            for filepath, data in contents.items():
+                add(tar, filepath, data, manifest["files"][filepath]["mode"])
+    return buffer.getvalue(), manifest
+
+
+def _stage(tar, filepath, entry, staging):
+    """Extract one file into the staging dir, checking it against release.json"""
+    if not _safe_path(filepath):
+        raise ValueError(f"unsafe path in bundle: {filepath}")
+    try:
+        member = tar.getmember(filepath)
+    except KeyError:
+        raise ValueError(f"{filepath} listed in {BUNDLE_MANIFEST} but not in bundle")
+    if not member.isfile():
+        raise ValueError(f"{filepath} is not a regular file")
+
+    staged_path = os.path.join(staging, filepath)
+    os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+    digest = hashlib.sha256()
+    source = tar.extractfile(member)
+    with source, open(staged_path, "wb") as f:
+        for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            f.write(chunk)
+    if digest.hexdigest() != entry["sha256"]:
+        raise ValueError(f"checksum mismatch for {filepath}")
+    os.chmod(staged_path, entry.get("mode", 0o644) & 0o777)
+    return staged_path
+
+
+def _local_hash(path):
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def apply_bundle(bundle_path, project_dir):
+    """
+    Unpack a downloaded (and checksum-verified) bundle into project_dir
+    Every file is extracted and checked in a staging dir first; only then
+    are the changed ones moved into place. Raises ValueError for a bad bundle
+    (nothing is touched). Returns list of updated paths
+    """
+    staging = tempfile.mkdtemp(prefix=".release-", dir=project_dir)
+    try:
+        with tarfile.open(bundle_path, "r:gz") as tar:
+            try:
+                manifest = json.load(tar.extractfile(tar.getmember(BUNDLE_MANIFEST)))
+            except (KeyError, ValueError):
+                raise ValueError(f"bundle has no readable {BUNDLE_MANIFEST}")
+            if manifest.get("format") != FORMAT_VERSION:
+                raise ValueError(f"unsupported bundle format: {manifest.get('format')}")
+
+            staged = [
+                (filepath, entry, _stage(tar, filepath, entry, staging))
+                for filepath, entry in manifest["files"].items()
+            ]
+
+        # Everything checked out - swap in the files that changed
+        updated = []
+        for filepath, entry, staged_path in staged:
+            target = os.path.join(project_dir, filepath)
+            if _local_hash(target) == entry["sha256"]:
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(staged_path, target)
+            updated.append(filepath)
+        return updated
+    except tarfile.TarError as e:
+        raise ValueError(f"unreadable bundle: {e}")
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
@@ -2,18 +2,19 @@
 """
 AI Reply Script - Generates responses based on knowledge base
 Uses Google Gemini API with context stuffing approach
+The static persona/rules + knowledge base are sent as a cached system prefix
 
 Usage: python3 reply.py
   - Reads customer question from clipboard
-  - Reads knowledge base from knowledge/faq.md
+  - Reads knowledge base from knowledge/faq.md (+ any matching collections)
+  - --kb eu,shipping: also use these KB collections (trigger suffix)
+  - --chat NAME: keep this chat's history under NAME (no history without it)
   - Returns AI-generated response
   - Logs usage to Supabase (if configured)
 """
 
-import urllib.request
-import json
-import os
-import time
+import hashlib
+import sys
 
 # Import shared utilities
 from utils import (
@@ -22,23 +23,53 @@ from utils import (
     log_usage,
     log_gap,
     parse_confidence,
-    get_knowledge_base_path,
+    span,
+    run_main,
+    call_with_deadline,
+    ensure_installed,
 )
 
-
-def load_knowledge_base():
-    """Load knowledge base content from file"""
-    kb_path = get_knowledge_base_path()
-    if not os.path.exists(kb_path):
-        return None, kb_path
-    with open(kb_path, "r") as f:
-        return f.read(), kb_path
-
-
-def generate_reply(question, knowledge_base, api_key, include_close=False):
-    """Send question + knowledge base to Gemini API"""
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={api_key}"
-
+# Installs still on the original snippet sync don't have the modules below
+# yet; the upgrade fetches them in the background
+ensure_installed(wait=False)
+
+try:
+    from router import route, get_tiers, validate_reply
+    from response_cache import ResponseCache, cache_key
+    from kb_collections import KnowledgeCollections, DEFAULT_COLLECTION
+    from conversations import load_conversation
+    import guardrails
+    import question_split
+    import fallback
+except ImportError as e:
+    print(f"Error: BSD Copilot is updating ({e.name} not installed yet). Try again in a minute.")
+    sys.exit(0)
+
+# Strongest model, used when routing is disabled or no model is given
+MODEL = "gemini-2.0-flash"
+
+
+# Number of KB sections an answer is assumed to depend on (for cache invalidation)
+CACHE_DEP_SECTIONS = 3
+
+
+def load_knowledge_base(question="", names=None, config=None):
+    """
+    Load the KB collections a question needs + their section indexes
+    names: collections requested explicitly (trigger suffix), else picked by keywords
+    Returns (KnowledgeSet, kb_path) - kb.text is None if no KB file exists
+    """
+    with span("kb_load"):
+        collections = KnowledgeCollections(config or load_config())
+        kb = collections.load(question, names)
+    return kb, collections.specs[DEFAULT_COLLECTION]["path"]
+
+
+def build_system_prompt(knowledge_base, include_close=False):
+    """
+    Build the static part of the prompt (persona, rules, knowledge base)
+    Identical across questions, so Gemini can serve it from a context cache
+    """
     # Build prompt based on whether closing CTA is wanted
     close_instruction = ""
     if include_close:
@@ -111,49 +142,207 @@ TOPIC: short-topic-slug
 The topic should be a 2-4 word lowercase slug (e.g., "return-policy", "shipping-terms", "payment-terms", "moq-requirements").
 
 REFERENCE INFORMATION:
-{knowledge_base}
-
-CUSTOMER MESSAGE:
-{question}
+{knowledge_base}"""
+
+    return prompt
+
+
+def build_user_prompt(question, parts_prompt=None, history=None):
+    """
+    Build the per-request part of the prompt (the customer message)
+    parts_prompt: sub-question breakdown for multi-question messages
+    history: earlier turns of this chat (conversation store)
+    """
+    blocks = []
+    if history:
+        blocks.append(f"""EARLIER IN THIS CHAT (context only - reply to the new message):
+{history}""")
+    blocks.append(f"""CUSTOMER MESSAGE:
+{question}""")
+    if parts_prompt:
+        blocks.append(parts_prompt)
+    blocks.append("YOUR RESPONSE:")
+    return "\n\n".join(blocks)
+
+
+def generate_reply(question, knowledge_base, api_key, include_close=False,
+                   use_cache=True, model=MODEL, parts_prompt=None, history=None):
+    """
+    Send question to Gemini with the knowledge base as a cached system prefix
+    Returns tuple of (reply_text, usage)
+    """
+    # The HTTP client (http.client, ssl) is only loaded once a call is made
+    from gemini import generate_content
+
+    with span("prompt_build"):
+        system_prompt = build_system_prompt(knowledge_base, include_close)
+    return generate_content(
+        model,
+        api_key,
+        build_user_prompt(question, parts_prompt, history),
+        system_prompt=system_prompt,
+        use_cache=use_cache,
+        timeout=30,
+    )
 
-YOUR RESPONSE:"""
 
-    data = {
-        "contents": [{
-            "parts": [{"text": prompt}]
-        }]
+def answer_question(question, kb, config, include_close=False, cache=None, history=None, deadline=None):
+    """
+    Full reply pipeline for one question: response cache -> routed model call -> parse
+    Shared by the ;reply trigger and batch mode
+
+    Args:
+        kb: KnowledgeSet from kb_collections (its text is the prompt context)
+        history: earlier turns of this chat; follow-ups bypass the response cache
+        deadline: seconds to wait for the model before answering from the FAQ
+            snippets (also used if the model errors); None waits and surfaces errors
+
+    Returns dict with reply, confidence, topic, parts, cached, metrics
+    parts: [{question, confidence, topic}] for multi-question messages, else []
+    """
+    knowledge_base = kb.text
+    template = hashlib.sha256(build_system_prompt("", include_close).encode("utf-8")).hexdigest()[:16]
+    # Same question against a different set of KBs is a different answer
+    key = cache_key(question, include_close, salt=template + ",".join(kb.names))
+
+    # A follow-up ("and Rotterdam?") means something different in every chat
+    if history:
+        cache = None
+
+    if cache is not None:
+        hit = cache.get(key, kb)
+        if hit:
+            return {
+                "reply": hit["reply"],
+                "confidence": hit["confidence"],
+                "topic": hit.get("topic"),
+                "parts": hit.get("parts", []),
+                "cached": True,
+                "metrics": {"cache_hit": True, "latency_ms": 0, "kb_collections": kb.names},
+            }
+
+    # Several questions in one message: retrieve per sub-question and ask for
+    # one merged reply with a confidence + topic per part
+    parts = question_split.split_questions(question) if config.get("split_questions", True) else []
+    parts_prompt = None
+    hints = []
+    if parts:
+        with span("retrieval"):
+            hints = question_split.find_hints(parts, kb)
+            titles = kb.section_titles(s for _, ids in hints for s in ids)
+            parts_prompt = question_split.build_parts_prompt(hints, titles)
+
+    # Generate reply - cheap model first, escalate if unsure or invalid
+    finished, outcome = call_with_deadline(lambda: route(
+        lambda model: generate_reply(
+            question, knowledge_base, config.get("gemini_api_key"), include_close,
+            use_cache=config.get("context_cache", True),
+            model=model,
+            parts_prompt=parts_prompt,
+            history=history,
+        ),
+        get_tiers(config),
+    ), deadline)
+
+    # Model too slow or down: the best canned FAQ answer, for the rep to review
+    if not finished:
+        return fallback.fallback_result(
+            question, "timeout", {"latency_ms": int(deadline * 1000), "kb_collections": kb.names}
+        )
+    raw_reply, metrics = outcome
+    metrics["kb_collections"] = kb.names
+    if deadline and raw_reply.startswith("Error:"):
+        return fallback.fallback_result(question, "error", metrics)
+
+    with span("parse"):
+        part_results = []
+        if parts:
+            raw_reply, part_results = question_split.parse_parts(raw_reply, parts)
+            metrics["sub_questions"] = len(parts)
+
+        # Parse confidence, topic, and clean response
+        confidence, topic, reply = parse_confidence(raw_reply)
+
+        # The reply is only as confident as its least confident part
+        if part_results and not raw_reply.startswith("Error:"):
+            worst = question_split.worst_confidence(*(p["confidence"] for p in part_results))
+            confidence = question_split.worst_confidence(confidence, worst)
+
+        # Output guardrails - downgrade or block known failure modes
+        if not raw_reply.startswith("Error:"):
+            reply, confidence, hits = guardrails.apply(reply, confidence, known=knowledge_base)
+            if hits:
+                metrics["guardrail_hits"] = hits
+
+    # Only cache real answers, never errors
+    if cache is not None and validate_reply(raw_reply) is None:
+        dep_ids = {section_id for section_id, _ in kb.search(question, k=CACHE_DEP_SECTIONS)}
+        dep_ids.update(section_id for _, ids in hints for section_id in ids)
+        deps = kb.section_hashes(dep_ids)
+        # No section to tie the answer to means no KB edit could ever invalidate it
+        if deps:
+            cache.put(
+                key,
+                {"reply": reply, "confidence": confidence, "topic": topic, "parts": part_results},
+                deps,
+            )
+
+    return {
+        "reply": reply,
+        "confidence": confidence,
+        "topic": topic,
+        "parts": part_results,
+        "cached": False,
+        "metrics": metrics,
     }
 
-    req = urllib.request.Request(
-        url,
-        data=json.dumps(data).encode("utf-8"),
-        headers={"Content-Type": "application/json"},
-        method="POST"
+
+def log_reply(trigger, question, result, config):
+    """Log usage + gap for an answered question"""
+    confidence = result["confidence"]
+
+    # Gap first, so its write time shows up in the usage entry's timings
+    # Multi-question messages log a gap per unsure sub-question instead
+    # FAQ-snippet fallbacks aren't KB gaps - the model never answered
+    if result.get("parts"):
+        for part in result["parts"]:
+            log_gap(part["question"], part["confidence"] or confidence, part["topic"] or result["topic"], config)
+    elif confidence in ("MEDIUM", "LOW") and not result["metrics"].get("fallback"):
+        log_gap(question, confidence, result["topic"], config)
+
+    log_usage(
+        trigger=trigger,
+        question=question,
+        response=result["reply"] if config.get("log_responses") else None,
+        confidence=confidence,
+        config=config,
+        metrics=result["metrics"],
     )
 
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            with urllib.request.urlopen(req, timeout=30) as response:
-                result = json.loads(response.read().decode("utf-8"))
-                return result["candidates"][0]["content"]["parts"][0]["text"]
-        except urllib.error.HTTPError as e:
-            if e.code == 429 and attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            return f"Error: {e.code} - {e.reason}"
-        except Exception as e:
-            return f"Error: {str(e)}"
 
-    return "Error: Rate limited. Please try again in a moment."
+def format_reply(result):
+    """Cleaned response for the rep (TOPIC stripped, prefix kept for visibility)"""
+    if result["confidence"] == "HIGH":
+        return result["reply"]
+    # Re-add the prefix for user to see
+    prefix = "[NEEDS INFO] " if result["confidence"] == "LOW" else "[REVIEW] "
+    return prefix + result["reply"]
 
 
 def main():
-    import sys
-
     # Check for --close flag
     include_close = "--close" in sys.argv
 
+    # Trigger suffix, e.g. ;reply-eu passes --kb eu
+    kb_names = None
+    if "--kb" in sys.argv[:-1]:
+        kb_names = sys.argv[sys.argv.index("--kb") + 1].split(",")
+
+    # Trigger suffix naming the chat, e.g. ;reply-c1 passes --chat c1
+    chat_name = None
+    if "--chat" in sys.argv[:-1]:
+        chat_name = sys.argv[sys.argv.index("--chat") + 1]
+
     # Load configuration
     config = load_config()
     api_key = config.get("gemini_api_key")
@@ -168,39 +357,43 @@ def main():
         print("Error: Clipboard is empty. Copy the customer question first.")
         return
 
-    # Load knowledge base
-    knowledge_base, kb_path = load_knowledge_base()
-    if not knowledge_base:
+    # Named chat? Send its compact history along with the new message
+    chat = None
+    history = None
+    if chat_name and config.get("conversation_memory", True):
+        with span("conversation"):
+            chat = load_conversation(chat_name)
+            history = chat.context()
+
+    # Load the knowledge base collections this question needs
+    try:
+        kb, kb_path = load_knowledge_base(question, kb_names, config)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+    if not kb.text:
         print(f"Error: Knowledge base not found at {kb_path}")
         return
 
-    # Generate reply
-    raw_reply = generate_reply(question, knowledge_base, api_key, include_close)
-
-    # Parse confidence, topic, and clean response
-    confidence, topic, reply = parse_confidence(raw_reply)
+    cache = ResponseCache() if config.get("response_cache", True) else None
 
-    # Log usage (non-blocking)
-    log_usage(
-        trigger=";reply",
-        question=question,
-        response=reply if config.get("log_responses") else None,
-        confidence=confidence,
-        config=config
+    result = answer_question(
+        question, kb, config, include_close, cache, history,
+        deadline=config.get("reply_deadline_s"),
     )
 
-    # Log gap if low/medium confidence
-    if confidence in ("MEDIUM", "LOW"):
-        log_gap(question, confidence, topic, config)
+    # Canned fallback text isn't something the model said; keep it out of the history
+    if chat is not None and not result["reply"].startswith("Error:") and not result["metrics"].get("fallback"):
+        chat.add_turn(question, result["reply"], result["topic"])
+        chat.save()
 
-    # Output the cleaned response (TOPIC stripped, prefix kept for user visibility)
-    if confidence == "HIGH":
-        print(reply)
-    else:
-        # Re-add the prefix for user to see
-        prefix = "[NEEDS INFO] " if confidence == "LOW" else "[REVIEW] "
-        print(prefix + reply)
+    if cache is not None and not result["cached"]:
+        cache.save()
+
+    log_reply(";reply", question, result, config)
+
+    print(format_reply(result))
 
 
 if __name__ == "__main__":
-    main()
+    run_main(main)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Response cache for BSD Sales Copilot
+Reuses AI replies for repeat questions against the same knowledge base
+
+Keyed by normalized question + reply mode + prompt version. Each entry records
+the KB sections it depended on ({section_id: hash}); editing one of those
+sections invalidates it, while edits elsewhere in the KB leave it alone.
+Stored as one small JSON file.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, ".cache")
+RESPONSE_CACHE_FILE = os.path.join(CACHE_DIR, "responses.json")
+
+# Entries older than this are ignored and pruned
+RESPONSE_CACHE_TTL = 7 * 24 * 3600
+
+# Keep the file small - oldest entries are dropped first
+RESPONSE_CACHE_MAX_ENTRIES = 2000
+
+
+def normalize_question(question):
+    """Lowercase, collapse whitespace, drop surrounding punctuation"""
+    text = re.sub(r"\s+", " ", question.lower()).strip()
+    return text.strip(" .!?,;:")
+
+
+def cache_key(question, include_close=False, salt=""):
+    """
+    Cache key for a question in a given reply mode
+    salt: anything else the answer depends on (e.g. prompt template hash)
+    """
+    mode = "close" if include_close else "reply"
+    raw = f"{mode}\n{salt}\n{normalize_question(question)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    In-memory view of the on-disk cache
+    Thread-safe so batch mode can share one instance across workers
+    """
+
+    def __init__(self, path=RESPONSE_CACHE_FILE, ttl=RESPONSE_CACHE_TTL,
+                 max_entries=RESPONSE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return {}
+
+    def get(self, key, index=None):
+        """
+        Return cached entry dict or None
+        With a KnowledgeIndex (or KnowledgeSet), entries whose KB sections
+        changed are treated as misses, as are entries with no sections to
+        check and unsure answers older than the newest KB section (the new
+        content might answer them)
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if not entry or entry.get("created", 0) + self.ttl <= time.time():
+            return None
+
+        if index is not None:
+            if not entry.get("deps") or not index.is_current(entry["deps"]):
+                return None
+            if entry.get("confidence") != "HIGH" and index.last_updated > entry["created"]:
+                return None
+
+        return entry
+
+    def put(self, key, entry, deps=None):
+        """
+        Store an entry (dict with reply, confidence, topic)
+        deps: {section_id: hash} of KB sections the answer relied on
+        """
+        entry = dict(entry, created=time.time(), deps=deps or {})
+        with self._lock:
+            self._entries[key] = entry
+
+    def invalidate(self, section_ids):
+        """
+        Drop entries that depended on any of the given KB sections
+        Returns number of entries dropped
+        """
+        section_ids = set(section_ids)
+        with self._lock:
+            stale = [
+                k for k, v in self._entries.items()
+                if section_ids & set(v.get("deps", {}))
+            ]
+            for k in stale:
+                del self._entries[k]
+        return len(stale)
+
+    def save(self):
+        """Prune and write to disk (best effort)"""
+        now = time.time()
+        with self._lock:
+            live = {
+                k: v for k, v in self._entries.items()
+                if v.get("created", 0) + self.ttl > now
+            }
+            if len(live) > self.max_entries:
+                newest = sorted(live.items(), key=lambda kv: kv[1]["created"])
+                live = dict(newest[-self.max_entries:])
+            self._entries = live
+            snapshot = json.dumps(live)
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                f.write(snapshot)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            pass
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Model routing for BSD Sales Copilot
+Tries the cheapest/fastest model first and escalates to a stronger model
+only when the answer is unsure (MEDIUM/LOW) or fails validation
+"""
+
+import time
+
+from utils import parse_confidence
+import guardrails
+
+# Ordered cheapest -> strongest. Override with "model_tiers" in config.json
+DEFAULT_TIERS = [
+    {"name": "fast", "model": "gemini-2.0-flash-lite"},
+    {"name": "strong", "model": "gemini-2.0-flash"},
+]
+
+# USD per 1M tokens: (input, cached input, output)
+MODEL_PRICES = {
+    "gemini-2.0-flash-lite": (0.075, 0.01875, 0.30),
+    "gemini-2.0-flash": (0.10, 0.025, 0.40),
+}
+
+# Confidence levels that trigger escalation to the next tier
+ESCALATE_ON = ("MEDIUM", "LOW")
+
+
+def estimate_cost(model, usage):
+    """Estimate USD cost of one call from its token usage"""
+    input_price, cached_price, output_price = MODEL_PRICES.get(model, (0, 0, 0))
+    cached = usage.get("cached_tokens", 0)
+    uncached = max(usage.get("prompt_tokens", 0) - cached, 0)
+    output = usage.get("output_tokens", 0)
+    return (uncached * input_price + cached * cached_price + output * output_price) / 1_000_000
+
+
+def validate_reply(raw_reply):
+    """
+    Basic sanity checks on model output
+    Returns reason string if invalid, None if OK
+    """
+    if not raw_reply or not raw_reply.strip():
+        return "empty"
+    if raw_reply.startswith("Error:"):
+        return "error"
+
+    confidence, topic, reply = parse_confidence(raw_reply)
+    if not reply:
+        return "empty"
+
+    # Prefix must be the very first thing, never mid-response
+    if "[NEEDS INFO]" in reply or "[REVIEW]" in reply:
+        return "misplaced-prefix"
+
+    # Blocked content is worth a retry on the stronger model
+    action, hits = guardrails.scan(reply)
+    if action == "block":
+        return "guardrail:" + ",".join(hits)
+
+    return None
+
+
+def get_tiers(config):
+    """Model tiers from config, falling back to defaults"""
+    if not config.get("routing_enabled", True):
+        return DEFAULT_TIERS[-1:]
+    return config.get("model_tiers") or DEFAULT_TIERS
+
+
+def route(call, tiers):
+    """
+    Run call(model) through the tiers until one gives a confident, valid answer
+
+    Args:
+        call: Function taking a model name, returning (raw_reply, usage)
+        tiers: List of {"name", "model"} dicts, cheapest first
+
+    Returns tuple of (raw_reply, metrics)
+    """
+    attempts = []
+    best = None  # Last valid reply, used if every tier is unsure
+
+    for i, tier in enumerate(tiers):
+        model = tier["model"]
+        start = time.perf_counter()
+        raw_reply, usage = call(model)
+        latency_ms = int((time.perf_counter() - start) * 1000)
+
+        reason = validate_reply(raw_reply)
+        confidence = None if reason else parse_confidence(raw_reply)[0]
+
+        attempts.append({
+            "tier": tier["name"],
+            "model": model,
+            "latency_ms": latency_ms,
+            "cost_usd": round(estimate_cost(model, usage), 8),
+            "confidence": confidence,
+            "rejected": reason,
+            "usage": usage,
+        })
+
+        if reason is None:
+            best = (raw_reply, i)
+            if confidence not in ESCALATE_ON:
+                break
+
+    if best is None:
+        # Nothing valid - surface the last tier's output (usually the error)
+        raw_reply, final = raw_reply, len(attempts) - 1
+    else:
+        raw_reply, final = best
+
+    final_attempt = attempts[final]
+    metrics = {
+        "model": final_attempt["model"],
+        "tier": final_attempt["tier"],
+        "escalated": len(attempts) > 1,
+        "latency_ms": sum(a["latency_ms"] for a in attempts),
+        "cost_usd": round(sum(a["cost_usd"] for a in attempts), 8),
+        "prompt_tokens": sum(a["usage"].get("prompt_tokens", 0) for a in attempts),
+        "cached_tokens": sum(a["usage"].get("cached_tokens", 0) for a in attempts),
+        "output_tokens": sum(a["usage"].get("output_tokens", 0) for a in attempts),
+        "tier_metrics": [
+            {k: v for k, v in a.items() if k != "usage"} for a in attempts
+        ],
+    }
+    return raw_reply, metrics
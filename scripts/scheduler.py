@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+BSD Sales Copilot - Background sync scheduler
+Replaces the two fixed 300s launchd jobs (log sync + snippet sync) with one
+long-running process that:
+  - adds jitter, so a fleet of machines doesn't hit Supabase/GitHub in lockstep
+  - adapts intervals: backs off when idle or erroring, speeds up when logs pile up
+  - runs jobs that fall due close together in one wakeup, sharing HTTP connections
+
+Usage: python3 scheduler.py [--once] [--status]
+  - No args: run forever (launchd keeps it alive)
+  - --once: run both jobs now and exit
+  - --status: print the current schedule and exit
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from http_pool import ConnectionPool
+from local_log import LOG_DIR, LOG_FILE
+import sync_logs
+import sync_snippets
+
+STATE_FILE = os.path.join(LOG_DIR, "scheduler.json")
+
+# Per-job interval bounds (seconds)
+JOBS = {
+    "logs": {"base": 300, "min": 60, "max": 1800},
+    "snippets": {"base": 600, "min": 300, "max": 3600},
+}
+
+# +/- fraction of each interval that is randomised
+JITTER = 0.2
+
+# Multiplier applied to the interval after an idle run
+IDLE_BACKOFF = 1.5
+
+# Jobs due within this window of the first due job run in the same wakeup
+MERGE_WINDOW = 90
+
+# How often to check whether local logs are piling up while asleep
+CHECK_INTERVAL = 60
+
+# Pending log size that pulls the log sync forward
+BURST_BYTES = 32 * 1024
+
+
+def jittered(seconds):
+    """Randomise an interval by +/- JITTER"""
+    return seconds * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+def load_state():
+    """Saved per-job interval/error state, so restarts keep backoff"""
+    state = {}
+    if os.path.exists(STATE_FILE):
+        try:
+            with open(STATE_FILE, "r") as f:
+                state = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            state = {}
+
+    state = {name: state.get(name, {}) for name in JOBS}
+    now = time.time()
+    for name, bounds in JOBS.items():
+        job = state[name]
+        job.setdefault("interval", bounds["base"])
+        job.setdefault("errors", 0)
+        # First run after (re)start: random offset so machines that boot together spread out
+        if job.get("next_run", 0) < now:
+            job["next_run"] = now + random.uniform(0, min(job["interval"], 120))
+    return state
+
+
+def save_state(state):
+    """Persist schedule (best effort)"""
+    try:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        tmp_path = STATE_FILE + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, STATE_FILE)
+    except Exception:
+        pass
+
+
+def next_interval(name, job, outcome):
+    """
+    Adapt a job's interval to what its last run found
+    outcome: "active" (did work), "idle" (nothing to do) or "error"
+    """
+    bounds = JOBS[name]
+
+    if outcome == "error":
+        job["errors"] += 1
+        return min(bounds["max"], bounds["base"] * 2 ** job["errors"])
+
+    job["errors"] = 0
+    if outcome == "active":
+        return bounds["base"]
+    return min(bounds["max"], job["interval"] * IDLE_BACKOFF)
+
+
+def pending_log_bytes():
+    """Size of the unsynced local log (cheap stat, no parsing)"""
+    try:
+        return os.path.getsize(LOG_FILE)
+    except OSError:
+        return 0
+
+
+def run_logs(pool):
+    """Log sync job -> outcome"""
+    result = sync_logs.run_sync(pool=pool)
+    if result["failed"]:
+        return "error"
+    return "active" if result["synced"] else "idle"
+
+
+def run_snippets(pool):
+    """Snippet sync job -> outcome"""
+    results = sync_snippets.run_sync(pool=pool)
+    if results is None:
+        return "idle"  # Sync disabled
+    if results["error"]:
+        return "error"
+    return "active" if results["updated"] else "idle"
+
+
+RUNNERS = {"logs": run_logs, "snippets": run_snippets}
+
+
+def code_stamp():
+    """mtimes of the code this process is running (synced by the snippet job)"""
+    stamp = []
+    for filepath in sorted(sync_snippets.SELF_FILES):
+        try:
+            stamp.append(os.path.getmtime(os.path.join(sync_snippets.PROJECT_DIR, filepath)))
+        except OSError:
+            stamp.append(None)
+    return stamp
+
+
+def run_due(state, names):
+    """Run the given jobs in one wakeup with a shared connection pool"""
+    pool = ConnectionPool()
+    try:
+        for name in names:
+            job = state[name]
+            try:
+                outcome = RUNNERS[name](pool)
+            except Exception as e:
+                sync_snippets.log(f"Scheduler: {name} job failed: {e}", "ERROR")
+                outcome = "error"
+
+            job["interval"] = next_interval(name, job, outcome)
+            job["last_run"] = time.time()
+            job["last_outcome"] = outcome
+            job["next_run"] = time.time() + jittered(job["interval"])
+            sync_snippets.log(f"Scheduler: {name} {outcome}, next in {int(job['next_run'] - time.time())}s")
+    finally:
+        pool.close()
+    save_state(state)
+
+
+def run_forever():
+    """Main loop: sleep until the next job is due, checking for log bursts"""
+    state = load_state()
+    save_state(state)
+    stamp = code_stamp()
+
+    while True:
+        now = time.time()
+
+        # Logs piling up? Pull the log sync forward (unless backing off from errors)
+        logs_job = state["logs"]
+        if (pending_log_bytes() >= BURST_BYTES and not logs_job["errors"]
+                and logs_job["next_run"] - now > JOBS["logs"]["min"]):
+            logs_job["interval"] = JOBS["logs"]["min"]
+            logs_job["next_run"] = now + jittered(JOBS["logs"]["min"]) / 2
+
+        first_due = min(job["next_run"] for job in state.values())
+        if first_due > now:
+            time.sleep(min(first_due - now, CHECK_INTERVAL))
+            continue
+
+        # Coalesce: anything due soon runs now, in the same wakeup
+        due = [name for name, job in state.items() if job["next_run"] <= now + MERGE_WINDOW]
+        run_due(state, due)
+
+        # The snippet sync updated our own code: restart into the new version,
+        # which syncs again shortly (its file list may have grown)
+        if code_stamp() != stamp:
+            sync_snippets.log("Scheduler: code updated, restarting")
+            state["snippets"]["next_run"] = 0
+            save_state(state)
+            os.execv(sys.executable, [sys.executable, os.path.abspath(__file__)] + sys.argv[1:])
+
+
+def print_status():
+    state = load_state()
+    now = time.time()
+    for name, job in state.items():
+        print(f"{name:9} every ~{int(job['interval'])}s, next in {max(0, int(job['next_run'] - now))}s, "
+              f"last: {job.get('last_outcome', 'never')}, errors: {job['errors']}")
+    print(f"pending log bytes: {pending_log_bytes()}")
+
+
+def main():
+    if "--status" in sys.argv:
+        print_status()
+        return
+
+    if "--once" in sys.argv:
+        run_due(load_state(), list(JOBS))
+        return
+
+    try:
+        run_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,14 @@
 #!/usr/bin/env python3
 """
 Background sync script - pushes local logs to Supabase
-Run via launchd (Mac) or Task Scheduler (Windows) every 5 minutes
+Run by scheduler.py (adaptive interval with jitter), or directly
+
 
 Usage: python3 sync_logs.py [--dry-run] [--verbose]
 """
 
 import json
+import re
 import sys
 import os
 from datetime import datetime
@@ -17,13 +19,109 @@ from urllib.error import URLError, HTTPError
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, SCRIPT_DIR)
 
-from local_log import read_logs, clear_logs, archive_failed_logs, get_log_stats
-from utils import load_config
+from local_log import read_logs, clear_logs, archive_failed_logs, get_log_stats, FAILED_FILE
+from utils import load_config, get_os
+
+# PostgREST's 400 for a column the project doesn't have (migration not applied)
+_UNKNOWN_COLUMN = re.compile(r"Could not find the '(\w+)' column")
+
+# Failed entries are retried on every sync; one the server keeps rejecting
+# (not a network error or outage) is dropped after this many syncs
+MAX_REJECTIONS = 5
+
+
+def _post(url, data, headers, pool=None):
+    """POST via the shared keep-alive pool if given, else a one-off urlopen"""
+    if pool is not None:
+        pool.request("POST", url, body=data, headers=headers, timeout=10)
+    else:
+        urlopen(Request(url, data=data, headers=headers, method="POST"), timeout=10)
+
+
+# Fields of a plain static-snippet event (log_trigger.sh / log_snippet.py)
+STATIC_FIELDS = {"type", "trigger", "user_id", "os", "timestamp"}
+
+
+def _unknown_column(error):
+    """Column named by a PostgREST unknown-column 400, or None"""
+    if error.code != 400 or error.fp is None:
+        return None
+    try:
+        match = _UNKNOWN_COLUMN.search(error.read().decode("utf-8", "replace"))
+    except Exception:
+        return None
+    return match.group(1) if match else None
+
+
+def _rejected(error):
+    """True if the server refused the row itself (retrying as-is won't help)"""
+    return isinstance(error, HTTPError) and 400 <= error.code < 500 and error.code not in (408, 429)
+
+
+def _insert(url, entry, headers, pool, missing, verbose=False):
+    """
+    POST one row, dropping columns the table doesn't have
+    A project that hasn't applied every migration rejects the whole row for
+    one unknown column; the row is resent without it rather than lost.
+    missing: set of columns already found missing (skipped up front)
+    """
+    for column in missing & set(entry):
+        del entry[column]
+    while True:
+        try:
+            _post(url, json.dumps(entry).encode("utf-8"), headers, pool)
+            return
+        except HTTPError as e:
+            column = _unknown_column(e)
+            if column is None or column not in entry:
+                raise
+            if verbose:
+                print(f"  Dropped column {column} (apply supabase/migrations to keep it)")
+            missing.add(column)
+            del entry[column]
+
+
+def _fill_identity(entry, config):
+    """Lightweight loggers (log_trigger.sh) leave user/os for us to fill in"""
+    if not entry.get("user_id"):
+        entry["user_id"] = config.get("user_id") or "unknown"
+    entry.setdefault("os", get_os())
 
 
-def sync_to_supabase(entries, config, verbose=False):
+def aggregate_static_events(entries, config):
+    """
+    Roll static-snippet events up into per-(trigger, user, os, hour) counters
+    AI events (anything with more than the static fields) are left as-is
+    Returns tuple of (counters, static_events, other_entries)
+    """
+    counters = {}
+    static_events = []
+    others = []
+
+    for entry in entries:
+        if entry.get("type", "usage") != "usage" or not set(entry) <= STATIC_FIELDS:
+            others.append(entry)
+            continue
+
+        _fill_identity(entry, config)
+        # Timestamps are UTC ISO 8601 ("2026-10-19T14:03:11Z"); truncate to the hour
+        timestamp = entry.get("timestamp") or datetime.utcnow().isoformat()
+        hour = timestamp[:13] + ":00:00Z"
+        key = (entry["trigger"], entry["user_id"], entry["os"], hour)
+
+        if key not in counters:
+            counters[key] = {"trigger": key[0], "user_id": key[1], "os": key[2], "hour": hour, "count": 0}
+        counters[key]["count"] += 1
+        static_events.append(entry)
+
+    return list(counters.values()), static_events, others
+
+
+def sync_to_supabase(entries, config, verbose=False, pool=None):
     """
     Sync log entries to Supabase
+    With aggregate_usage on, static-snippet events go up as hourly counters
+    in one request; AI events and gaps still get a row each
     Returns tuple of (success_count, failed_entries)
     """
     if not entries:
@@ -37,13 +135,43 @@ def sync_to_supabase(entries, config, verbose=False):
             print("Supabase not configured, skipping sync")
         return 0, entries
 
+    headers = {
+        "Content-Type": "application/json",
+        "apikey": supabase_key,
+        "Authorization": f"Bearer {supabase_key}",
+        "Prefer": "return=minimal",
+    }
+
     success_count = 0
     failed_entries = []
+    # Times each entry was rejected before (set again on the failed ones)
+    rejections = {id(entry): entry.pop("_rejections", 0) for entry in entries}
+    rejected = set()
+    missing = {}  # table -> columns it doesn't have
+
+    if config.get("aggregate_usage"):
+        counters, static_events, entries = aggregate_static_events(entries, config)
+        if counters:
+            try:
+                _post(f"{supabase_url}/rest/v1/usage_counters", json.dumps(counters).encode("utf-8"), headers, pool)
+                success_count += len(static_events)
+                if verbose:
+                    print(f"  Synced: {len(static_events)} snippet uses as {len(counters)} counters")
+            except Exception as e:
+                if verbose:
+                    print(f"  Failed: usage counters - {e}")
+                # The raw events go to the failed archive with everything else
+                failed_entries.extend(static_events)
+                if _rejected(e):
+                    rejected.update(id(event) for event in static_events)
 
     for entry in entries:
         entry_type = entry.pop("type", "usage")
         table = "gaps" if entry_type == "gap" else "usage_logs"
 
+        if table == "usage_logs":
+            _fill_identity(entry, config)
+
         # Handle field mapping for gaps table
         if table == "gaps" and "timestamp" in entry:
             entry["first_seen"] = entry.pop("timestamp")
@@ -51,18 +179,7 @@ def sync_to_supabase(entries, config, verbose=False):
 
         try:
             url = f"{supabase_url}/rest/v1/{table}"
-            req = Request(
-                url,
-                data=json.dumps(entry).encode("utf-8"),
-                headers={
-                    "Content-Type": "application/json",
-                    "apikey": supabase_key,
-                    "Authorization": f"Bearer {supabase_key}",
-                    "Prefer": "return=minimal",
-                },
-                method="POST"
-            )
-            urlopen(req, timeout=10)
+            _insert(url, entry, headers, pool, missing.setdefault(table, set()), verbose)
             success_count += 1
             if verbose:
                 print(f"  Synced: {entry.get('trigger', entry_type)}")
@@ -71,27 +188,31 @@ def sync_to_supabase(entries, config, verbose=False):
                 print(f"  Failed: {entry.get('trigger', entry_type)} - {e}")
             entry["type"] = entry_type  # Restore type for retry
             failed_entries.append(entry)
+            if _rejected(e):
+                rejected.add(id(entry))
         except Exception as e:
             if verbose:
                 print(f"  Error: {e}")
             entry["type"] = entry_type
             failed_entries.append(entry)
 
-    return success_count, failed_entries
+    for entry in failed_entries:
+        count = rejections.get(id(entry), 0) + (id(entry) in rejected)
+        if count:
+            entry["_rejections"] = count
 
+    return success_count, failed_entries
 
-def main():
-    dry_run = "--dry-run" in sys.argv
-    verbose = "--verbose" in sys.argv or "-v" in sys.argv
 
-    if verbose:
-        print(f"BSD Sales Copilot - Log Sync")
-        print(f"Time: {datetime.now().isoformat()}")
-        print("-" * 40)
-
-    # Get pending logs
+def run_sync(verbose=False, dry_run=False, pool=None):
+    """
+    One sync pass: push pending local logs to Supabase
+    Returns dict with pending, synced and failed counts
+    """
+    # Get pending logs, plus earlier failures (retried until they go through)
     stats = get_log_stats()
-    entries = read_logs()
+    entries = read_logs() + read_logs(FAILED_FILE)
+    result = {"pending": len(entries), "synced": 0, "failed": 0}
 
     if verbose:
         print(f"Pending logs: {stats['pending_count']}")
@@ -100,7 +221,7 @@ def main():
     if not entries:
         if verbose:
             print("No logs to sync")
-        return
+        return result
 
     if dry_run:
         print(f"\nDry run - would sync {len(entries)} entries:")
@@ -108,33 +229,56 @@ def main():
             print(f"  {entry.get('type', 'usage')}: {entry.get('trigger', 'N/A')}")
         if len(entries) > 10:
             print(f"  ... and {len(entries) - 10} more")
-        return
+        return result
 
     # Load config
     config = load_config()
 
+    # Nothing to sync to: keep everything pending rather than archive it as failed
+    if not config.get("supabase_url") or not config.get("supabase_anon_key"):
+        if verbose:
+            print("Supabase not configured, skipping sync")
+        return result
+
     if verbose:
         print(f"\nSyncing to Supabase...")
 
     # Sync to Supabase
-    success_count, failed = sync_to_supabase(entries, config, verbose)
+    success_count, failed = sync_to_supabase(entries, config, verbose, pool)
+    result["synced"] = success_count
+    result["failed"] = len(failed)
 
     if verbose:
         print(f"\nResults:")
         print(f"  Success: {success_count}")
         print(f"  Failed: {len(failed)}")
 
-    # Clear successful logs
-    if success_count > 0 and len(failed) == 0:
-        clear_logs()
-        if verbose:
-            print("  Cleared local logs")
-    elif len(failed) > 0:
-        # Some failed - archive them for retry
-        clear_logs()
-        archive_failed_logs(failed)
+    # Clear synced logs; the failed archive is rewritten with what's left
+    clear_logs()
+    clear_logs(FAILED_FILE)
+    if verbose:
+        print("  Cleared local logs")
+    if failed:
+        retry = [entry for entry in failed if entry.get("_rejections", 0) < MAX_REJECTIONS]
+        archive_failed_logs(retry)
         if verbose:
-            print(f"  Archived {len(failed)} failed entries for retry")
+            print(f"  Archived {len(retry)} failed entries for retry")
+            if len(retry) < len(failed):
+                print(f"  Gave up on {len(failed) - len(retry)} entries rejected {MAX_REJECTIONS} times")
+
+    return result
+
+
+def main():
+    dry_run = "--dry-run" in sys.argv
+    verbose = "--verbose" in sys.argv or "-v" in sys.argv
+
+    if verbose:
+        print(f"BSD Sales Copilot - Log Sync")
+        print(f"Time: {datetime.now().isoformat()}")
+        print("-" * 40)
+
+    run_sync(verbose, dry_run)
 
     if verbose:
         print("-" * 40)
@@ -3,17 +3,24 @@
 BSD Sales Copilot - Snippet Sync Script
 Downloads latest snippets from GitHub and updates local copies
 
-Runs every 5 minutes via launchd. Users never interact with this.
+Run by scheduler.py (adaptive interval with jitter). Users never interact with this.
+
+Usage: python3 sync_snippets.py [--no-restart]
+  - --no-restart: don't restart Espanso after updating files
 """
 
 import os
 import sys
 import json
+import zlib
+import shutil
 import hashlib
 import subprocess
 from datetime import datetime
 from urllib.request import urlopen, Request
-from urllib.error import URLError, HTTPError
+from urllib.error import HTTPError
+
+import release_bundle
 
 # Paths
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -29,17 +36,70 @@ DEFAULT_CONFIG = {
     "github_branch": "main",
     "sync_enabled": True,
     "files_to_sync": [
+        # The sync itself comes first, so a pass that updates it can be
+        # re-run with the new code (and its file list) - see SELF_FILES
+        "scripts/sync_snippets.py",
+        "scripts/release_bundle.py",
+        "scripts/http_pool.py",
+        "scripts/scheduler.py",
+        "scripts/sync_logs.py",
+        "scripts/local_log.py",
+        # Template for the scheduler LaunchAgent (see migrate_launch_agents)
+        "install/com.bsd.salescopilot.scheduler.plist",
+        # Helpers referenced by the match files come before the match files
+        "scripts/log_trigger.sh",
         "match/base.yml",
         "match/faq.yml",
         "scripts/reply.py",
         "scripts/polish.py",
         "scripts/utils.py",
-        "scripts/local_log.py",
+        "scripts/capture.py",
+        "scripts/gemini.py",
+        "scripts/router.py",
+        "scripts/response_cache.py",
+        "scripts/batch_reply.py",
+        "scripts/guardrails.py",
+        "scripts/question_split.py",
+        "scripts/fallback.py",
+        "scripts/conversations.py",
+        "scripts/kb_index.py",
+        "scripts/kb_collections.py",
         "scripts/log_snippet.py",
         "knowledge/faq.md",
-    ]
+        "knowledge/guardrails.json",
+    ],
+    # Use manifest.json (per-file SHA-256 + block hashes) when the repo has one
+    "use_manifest": True,
+    # Poll releases/LATEST and apply whole release bundles when the repo publishes them
+    "use_releases": True,
 }
 
+# Written by build_manifest.py at the repo root
+MANIFEST_FILE = "manifest.json"
+
+# Code the sync (and scheduler.py) is running; when a pass updates any of it,
+# run_sync() reports "reload" so the caller starts over with the new code
+SELF_FILES = {
+    "scripts/sync_snippets.py",
+    "scripts/release_bundle.py",
+    "scripts/http_pool.py",
+    "scripts/scheduler.py",
+    "scripts/sync_logs.py",
+    "scripts/local_log.py",
+}
+
+# LaunchAgents: the fixed-300s jobs installers used to set up, and the
+# scheduler that replaced them (existing installs are moved over by the sync)
+LAUNCH_AGENTS_DIR = os.path.expanduser("~/Library/LaunchAgents")
+LEGACY_AGENTS = ["com.bsd.salescopilot.sync", "com.bsd.salescopilot.snippetsync"]
+SCHEDULER_AGENT = "com.bsd.salescopilot.scheduler"
+
+# Read/hash files in chunks this size
+CHUNK_SIZE = 64 * 1024
+
+# Fall back to a full (gzipped) download when a delta would fetch more than this fraction
+MAX_DELTA_FRACTION = 0.5
+
 
 def ensure_dirs():
     """Create necessary directories"""
@@ -80,65 +140,219 @@ def load_config():
 
 
 def get_file_hash(filepath):
-    """Get MD5 hash of local file"""
+    """Get SHA-256 hash of local file (streamed)"""
     if not os.path.exists(filepath):
         return None
 
+    digest = hashlib.sha256()
     with open(filepath, "rb") as f:
-        return hashlib.md5(f.read()).hexdigest()
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
 
 
-def download_file(repo, branch, filepath, token=None):
-    """
-    Download file from GitHub raw
-    For private repos, pass a GitHub personal access token
-    """
-    url = f"https://raw.githubusercontent.com/{repo}/{branch}/{filepath}"
+def raw_url(repo, branch, filepath):
+    return f"https://raw.githubusercontent.com/{repo}/{branch}/{filepath}"
+
 
+def request_headers(token=None, gzip=True):
+    """GitHub raw request headers; gzip off for Range requests"""
     headers = {"User-Agent": "BSD-SalesCopilot-Sync/1.0"}
+    if gzip:
+        headers["Accept-Encoding"] = "gzip"
     if token:
         headers["Authorization"] = f"token {token}"
+    return headers
+
+
+def open_url(url, headers, pool=None):
+    """
+    GET a URL, returning the unread response
+    Uses the shared keep-alive connection pool if given
+    """
+    if pool is not None:
+        return pool.open("GET", url, headers=headers, timeout=30)
+    return urlopen(Request(url, headers=headers), timeout=30)
+
+
+def read_body(response):
+    """Yield the response body in chunks, gunzipping if the server compressed it"""
+    decoder = None
+    if (response.getheader("Content-Encoding") or "").lower() == "gzip":
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+    for chunk in iter(lambda: response.read(CHUNK_SIZE), b""):
+        yield decoder.decompress(chunk) if decoder else chunk
+    if decoder:
+        yield decoder.flush()
+
+
+def download_file(repo, branch, filepath, dest_path, token=None, pool=None):
+    """
+    Stream a file from GitHub raw into dest_path, hashing as it goes
+    For private repos, pass a GitHub personal access token
+    Returns SHA-256 of the content, or None if it could not be fetched
+    """
+    url = raw_url(repo, branch, filepath)
 
     try:
-        req = Request(url, headers=headers)
-        with urlopen(req, timeout=30) as response:
-            content = response.read()
-            return content, hashlib.md5(content).hexdigest()
+        response = open_url(url, request_headers(token), pool)
+        digest = hashlib.sha256()
+        with response, open(dest_path, "wb") as f:
+            for chunk in read_body(response):
+                digest.update(chunk)
+                f.write(chunk)
+        return digest.hexdigest()
     except HTTPError as e:
         if e.code == 404:
             log(f"File not found on GitHub: {filepath}", "WARN")
-            return None, None
+            return None
         elif e.code == 401 or e.code == 403:
             log(f"GitHub auth failed for {filepath} - repo may be private. Add github_token to config.json", "ERROR")
-            return None, None
-        raise
-    except Exception as e:
+            return None
         raise
 
 
-def sync_file(repo, branch, filepath, project_dir, token=None):
+def fetch_manifest(repo, branch, token=None, pool=None):
+    """
+    Download manifest.json (per-file SHA-256, size, block hashes)
+    Returns the manifest dict, or None if the repo doesn't publish one
+    """
+    try:
+        response = open_url(raw_url(repo, branch, MANIFEST_FILE), request_headers(token), pool)
+        with response:
+            manifest = json.loads(b"".join(read_body(response)))
+        version = manifest.get("version") if isinstance(manifest, dict) else None
+        if version != 1:
+            log(f"Unsupported manifest version: {version}", "WARN")
+            return None
+        return manifest
+    except HTTPError as e:
+        if e.code != 404:
+            log(f"Could not fetch manifest: {e}", "WARN")
+        return None
+    except (OSError, ValueError) as e:
+        # OSError covers URLError and socket timeouts
+        log(f"Could not fetch manifest: {e}", "WARN")
+        return None
+
+
+def local_blocks(filepath, block_size):
+    """{block SHA-256: offset} for a local file, read block by block"""
+    blocks = {}
+    with open(filepath, "rb") as f:
+        offset = 0
+        for block in iter(lambda: f.read(block_size), b""):
+            blocks.setdefault(hashlib.sha256(block).hexdigest(), offset)
+            offset += len(block)
+    return blocks
+
+
+def patch_file(repo, branch, filepath, local_path, entry, block_size, dest_path, token=None, pool=None):
+    """
+    Rebuild a changed file from the blocks we already have plus HTTP Range
+    requests for the rest. Blocks are matched by hash at any block-aligned
+    offset, so appends and in-place edits are cheap; insertions that shift
+    the rest of the file are not, and fall back to a full download.
+    Returns SHA-256 of the rebuilt file, or None to fall back
+    """
+    have = local_blocks(local_path, block_size)
+    remote = entry["blocks"]
+
+    # Coalesce runs of missing blocks into byte ranges
+    ranges = []
+    for i, block_hash in enumerate(remote):
+        if block_hash in have:
+            continue
+        start = i * block_size
+        end = min(start + block_size, entry["size"]) - 1
+        if ranges and ranges[-1][1] == start - 1:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+
+    missing = sum(end - start + 1 for start, end in ranges)
+    if missing > entry["size"] * MAX_DELTA_FRACTION:
+        return None
+
+    fetched = {}
+    url = raw_url(repo, branch, filepath)
+    for start, end in ranges:
+        headers = request_headers(token, gzip=False)
+        headers["Range"] = f"bytes={start}-{end}"
+        response = open_url(url, headers, pool)
+        with response:
+            data = response.read()
+        if response.status != 206 or len(data) != end - start + 1:
+            return None  # Server ignored the Range header
+        fetched[start] = data
+
+    digest = hashlib.sha256()
+    with open(local_path, "rb") as src, open(dest_path, "wb") as f:
+        for i, block_hash in enumerate(remote):
+            start = i * block_size
+            if block_hash in have:
+                src.seek(have[block_hash])
+                block = src.read(block_size if start + block_size <= entry["size"] else entry["size"] - start)
+            else:
+                range_start = max(r for r in fetched if r <= start)
+                block = fetched[range_start][start - range_start:start - range_start + block_size]
+            digest.update(block)
+            f.write(block)
+
+    log(f"Patched {filepath}: fetched {missing} of {entry['size']} bytes")
+    return digest.hexdigest()
+
+
+def sync_file(repo, branch, filepath, project_dir, token=None, pool=None, manifest=None):
     """
     Sync a single file from GitHub
-    Returns: "updated", "unchanged", or "error"
+    With a manifest, unchanged files are never fetched and changed ones are
+    patched block by block where possible. A download that doesn't match its
+    manifest entry marks the manifest "stale": the file is still updated and
+    the manifest is no longer trusted to skip files
+    Returns: "updated", "unchanged", "skipped" or "error"
     """
     local_path = os.path.join(project_dir, filepath)
     local_hash = get_file_hash(local_path)
+    entry = None
+    if manifest and not manifest.get("stale"):
+        entry = manifest.get("files", {}).get(filepath)
+
+    if entry and local_hash == entry["sha256"]:
+        return "unchanged"
 
+    tmp_path = local_path + ".sync-tmp"
     try:
-        content, remote_hash = download_file(repo, branch, filepath, token)
+        # Ensure directory exists
+        os.makedirs(os.path.dirname(local_path), exist_ok=True)
 
-        if content is None:
-            return "skipped"
+        remote_hash = None
+        if entry and local_hash and len(entry.get("blocks", [])) > 1:
+            try:
+                remote_hash = patch_file(repo, branch, filepath, local_path, entry,
+                                         manifest["block_size"], tmp_path, token, pool)
+            except OSError as e:
+                log(f"Delta update of {filepath} failed ({e}), downloading in full", "WARN")
+            if remote_hash is not None and remote_hash != entry["sha256"]:
+                log(f"Patched {filepath} does not match manifest, downloading in full", "WARN")
+                remote_hash = None
+
+        if remote_hash is None:
+            remote_hash = download_file(repo, branch, filepath, tmp_path, token, pool)
+            if remote_hash is None:
+                return "skipped"
+            if entry and (remote_hash != entry["sha256"] or os.path.getsize(tmp_path) != entry["size"]):
+                log(f"{filepath} does not match manifest.json, which is out of date", "WARN")
+                manifest["stale"] = True
 
         if local_hash == remote_hash:
             return "unchanged"
 
-        # Ensure directory exists
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
-
-        # Write new content
-        with open(local_path, "wb") as f:
-            f.write(content)
+        # Swap in atomically, keeping the existing file mode
+        if os.path.exists(local_path):
+            shutil.copymode(local_path, tmp_path)
+        os.replace(tmp_path, local_path)
 
         log(f"Updated: {filepath}")
         return "updated"
@@ -146,6 +360,101 @@ def sync_file(repo, branch, filepath, project_dir, token=None):
     except Exception as e:
         log(f"Failed to sync {filepath}: {e}", "ERROR")
         return "error"
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def release_state_path(project_dir):
+    return os.path.join(project_dir, "scripts", ".cache", "release.json")
+
+
+def load_release_state(project_dir):
+    """The release applied last ({release, created, sha256}), or {}"""
+    try:
+        with open(release_state_path(project_dir), "r") as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return {}
+
+
+def save_release_state(project_dir, pointer):
+    path = release_state_path(project_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({k: pointer[k] for k in ("release", "created", "sha256")}, f)
+
+
+def fetch_release_pointer(repo, branch, token=None, pool=None):
+    """
+    Download releases/LATEST (a few hundred bytes)
+    Returns the pointer dict, or None if the repo doesn't publish releases
+    Raises OSError (URLError, HTTPError, timeouts) if it can't be fetched,
+    ValueError if it isn't a JSON object
+    """
+    try:
+        response = open_url(raw_url(repo, branch, release_bundle.POINTER_FILE), request_headers(token), pool)
+    except HTTPError as e:
+        if e.code == 404:
+            return None
+        raise
+    with response:
+        pointer = json.loads(b"".join(read_body(response)))
+    if not isinstance(pointer, dict):
+        raise ValueError(f"{release_bundle.POINTER_FILE} is not a JSON object")
+    return pointer
+
+
+def sync_release(repo, branch, pointer, project_dir, key=None, token=None, pool=None):
+    """
+    Apply the release a pointer names, unless it is already applied
+    The bundle is downloaded and checked in full (pointer signature, bundle
+    SHA-256, every file's checksum) before any file is replaced
+    Returns tuple of ("updated"|"unchanged"|"error", [updated paths])
+    """
+    state = load_release_state(project_dir)
+    if state.get("sha256") == pointer.get("sha256"):
+        return "unchanged", []
+
+    reason = release_bundle.verify_pointer(pointer, key)
+    if reason:
+        log(f"Rejected release pointer: {reason}", "ERROR")
+        return "error", []
+    if state.get("created") and pointer["created"] < state["created"]:
+        log(f"Rejected release {pointer['release']}: older than applied release {state['release']}", "ERROR")
+        return "error", []
+
+    tmp_path = os.path.join(project_dir, f".release-{os.getpid()}.tar.gz")
+    try:
+        sha = download_file(repo, branch, pointer["bundle"], tmp_path, token, pool)
+        if sha is None:
+            return "error", []
+        if sha != pointer["sha256"] or os.path.getsize(tmp_path) != pointer["size"]:
+            log(f"Release {pointer['release']}: bundle does not match pointer", "ERROR")
+            return "error", []
+
+        updated = release_bundle.apply_bundle(tmp_path, project_dir)
+        save_release_state(project_dir, pointer)
+        log(f"Applied release {pointer['release']}: {len(updated)} file(s) updated")
+        for filepath in updated:
+            log(f"Updated: {filepath}")
+        return "updated", updated
+    except (OSError, ValueError) as e:
+        log(f"Failed to apply release {pointer.get('release')}: {e}", "ERROR")
+        return "error", []
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def reindex_knowledge_base(kb_path):
+    """Incrementally refresh the KB section index after a KB update"""
+    try:
+        from kb_collections import reindex_path
+        changed = reindex_path(kb_path)
+        log(f"Re-indexed {len(changed)} knowledge base section(s)")
+    except Exception as e:
+        log(f"Failed to re-index knowledge base: {e}", "WARN")
 
 
 def restart_espanso():
@@ -171,8 +480,58 @@ def restart_espanso():
         return False
 
 
-def main():
-    """Main sync function"""
+def migrate_launch_agents(project_dir):
+    """
+    Move a Mac install off the legacy fixed-300s LaunchAgents onto the scheduler
+    Existing installs update through this sync and never rerun the installer,
+    so the sync does what install-mac.sh step 8 does: load the scheduler, then
+    unload and delete the legacy jobs. The snippetsync job is the one running
+    this, so it goes last.
+    Returns True if anything was migrated
+    """
+    if sys.platform != "darwin":
+        return False
+    legacy = [label for label in LEGACY_AGENTS
+              if os.path.exists(os.path.join(LAUNCH_AGENTS_DIR, f"{label}.plist"))]
+    if not legacy:
+        return False
+
+    template = os.path.join(project_dir, "install", f"{SCHEDULER_AGENT}.plist")
+    if not os.path.exists(template):
+        log("Scheduler LaunchAgent template not synced yet, keeping legacy jobs", "WARN")
+        return False
+
+    try:
+        target = os.path.join(LAUNCH_AGENTS_DIR, f"{SCHEDULER_AGENT}.plist")
+        with open(template, "r") as f:
+            plist = f.read()
+        plist = plist.replace("__BSD_COPILOT_PATH__", project_dir).replace("__HOME__", os.path.expanduser("~"))
+        os.makedirs(os.path.expanduser("~/Library/Logs/BSDSalesCopilot"), exist_ok=True)
+        with open(target, "w") as f:
+            f.write(plist)
+        subprocess.run(["launchctl", "unload", target], capture_output=True, timeout=30)
+        result = subprocess.run(["launchctl", "load", target], capture_output=True, text=True, timeout=30)
+        if result.returncode != 0:
+            log(f"Could not load the scheduler LaunchAgent: {result.stderr.strip()}", "ERROR")
+            return False
+        log("Loaded the scheduler LaunchAgent")
+
+        for label in legacy:
+            log(f"Removing legacy LaunchAgent {label}")
+            os.remove(os.path.join(LAUNCH_AGENTS_DIR, f"{label}.plist"))
+            subprocess.run(["launchctl", "remove", label], capture_output=True, timeout=30)
+        return True
+    except (OSError, subprocess.SubprocessError) as e:
+        log(f"Could not migrate LaunchAgents: {e}", "ERROR")
+        return False
+
+
+def run_sync(pool=None, restart=True):
+    """
+    One sync pass over all files
+    Returns results dict (updated/unchanged/error/skipped counts, and reload:
+    True if the sync's own code changed), or None if disabled
+    """
     log("=" * 50)
     log("Starting sync")
 
@@ -181,7 +540,7 @@ def main():
     # Check if sync is enabled
     if not config.get("sync_enabled", True):
         log("Sync disabled in config, skipping")
-        return
+        return None
 
     repo = config.get("github_repo", DEFAULT_CONFIG["github_repo"])
     branch = config.get("github_branch", DEFAULT_CONFIG["github_branch"])
@@ -198,22 +557,87 @@ def main():
     project_dir = os.environ.get("BSD_COPILOT_PATH", PROJECT_DIR)
     log(f"Project dir: {project_dir}")
 
-    # Sync each file
     results = {"updated": 0, "unchanged": 0, "error": 0, "skipped": 0}
+    updated_files = []
 
-    for filepath in files:
-        result = sync_file(repo, branch, filepath, project_dir, token)
-        results[result] += 1
+    # Release bundles: poll the pointer only, apply a whole release at once
+    pointer = None
+    if config.get("use_releases", True):
+        try:
+            pointer = fetch_release_pointer(repo, branch, token, pool)
+        except (OSError, ValueError) as e:
+            log(f"Could not fetch release pointer: {e}", "ERROR")
+            results["error"] += 1
+            log("=" * 50)
+            return results
+
+    if pointer is not None:
+        result, updated_files = sync_release(
+            repo, branch, pointer, project_dir, config.get("release_key"), token, pool
+        )
+        # Count files, so an applied release with no changes doesn't restart Espanso
+        results[result] += len(updated_files) if result == "updated" else 1
+    else:
+        manifest = None
+        if config.get("use_manifest", True):
+            manifest = fetch_manifest(repo, branch, token, pool)
+            if manifest:
+                log(f"Using manifest ({len(manifest.get('files', {}))} files)")
+
+        # Sync each file, noting the ones skipped on the manifest's word
+        synced = {}
+        trusted = []
+        for filepath in files:
+            if manifest and not manifest.get("stale"):
+                trusted.append(filepath)
+            synced[filepath] = sync_file(repo, branch, filepath, project_dir, token, pool, manifest)
+
+        # A stale manifest may also have hidden changes to files it skipped
+        if manifest and manifest.get("stale"):
+            log("Re-checking files skipped by the stale manifest", "WARN")
+            for filepath in trusted:
+                if synced[filepath] == "unchanged":
+                    synced[filepath] = sync_file(repo, branch, filepath, project_dir, token, pool)
+
+        for filepath, result in synced.items():
+            results[result] += 1
+            if result == "updated":
+                updated_files.append(filepath)
+
+    # Re-index only the KB sections that changed (and drop dependent cached replies)
+    for filepath in updated_files:
+        if filepath.startswith("knowledge/") and filepath.endswith(".md"):
+            reindex_knowledge_base(os.path.join(project_dir, filepath))
 
     # Summary
     log(f"Sync complete: {results['updated']} updated, {results['unchanged']} unchanged, {results['error']} errors, {results['skipped']} skipped")
 
     # Restart Espanso if any files were updated
-    if results["updated"] > 0:
+    if results["updated"] > 0 and restart:
         log("Files changed, restarting Espanso...")
         restart_espanso()
 
+    results["reload"] = any(filepath in SELF_FILES for filepath in updated_files)
     log("=" * 50)
+    return results
+
+
+def main():
+    """Main sync function (exits 1 unless every file synced, for utils.ensure_installed)"""
+    restart = "--no-restart" not in sys.argv
+    results = run_sync(restart=restart)
+
+    # This pass ran the old code (and its file list); go again with the new one
+    if results and results.get("reload"):
+        log("Sync code updated, syncing again with the new version")
+        rerun = subprocess.run([sys.executable, os.path.abspath(__file__)] + sys.argv[1:], timeout=600)
+        sys.exit(rerun.returncode)
+
+    # Legacy launchd jobs run this script directly; the scheduler never does
+    migrate_launch_agents(os.environ.get("BSD_COPILOT_PATH", PROJECT_DIR))
+
+    if results and (results["error"] or results["skipped"]):
+        sys.exit(1)
 
 
 if __name__ == "__main__":
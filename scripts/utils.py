@@ -4,12 +4,11 @@ Shared utilities for BSD Sales Copilot scripts
 Cross-platform clipboard, logging, and configuration management
 """
 
-import subprocess
-import platform
 import json
 import os
 import sys
-from datetime import datetime
+import threading
+import time
 
 # Local-first logging
 from local_log import log_local
@@ -25,12 +24,152 @@ CONFIG_PATH = os.environ.get(
 )
 
 
+# --- Profiling -------------------------------------------------------------
+# BSD_PROFILE=1 records per-stage timings (ms) into the usage log entry.
+# BSD_CPROFILE=<path> also dumps cProfile stats for the run (see run_main).
+# When disabled, span() returns a shared no-op context manager.
+
+_PROCESS_START = time.perf_counter()
+_profiling = os.environ.get("BSD_PROFILE") == "1" or bool(os.environ.get("BSD_CPROFILE"))
+_span_state = threading.local()
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = (time.perf_counter() - self.start) * 1000
+        timings = _thread_timings()
+        timings[self.name] = timings.get(self.name, 0) + elapsed
+        return False
+
+
+def _thread_timings():
+    if not hasattr(_span_state, "timings"):
+        _span_state.timings = {}
+    return _span_state.timings
+
+
+def enable_profiling():
+    """Turn on span timing for the rest of this process"""
+    global _profiling
+    _profiling = True
+
+
+def span(name):
+    """
+    Time a stage of the hot path: `with span("kb_load"): ...`
+    Repeated spans with the same name accumulate
+    """
+    if not _profiling:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def start_timings():
+    """
+    Start a fresh measurement on this thread: drops unpopped spans and makes
+    "total" count from now (call per item when one process handles many)
+    """
+    _span_state.timings = {}
+    _span_state.start = time.perf_counter()
+
+
+def pop_timings():
+    """
+    Per-stage timings (ms) recorded on this thread since the last call
+    "total" runs from start_timings(), the previous pop_timings() on this
+    thread, or process start (so a single trigger includes its imports)
+    Returns None when profiling is off
+    """
+    if not _profiling:
+        return None
+    now = time.perf_counter()
+    timings = {k: round(v, 2) for k, v in _thread_timings().items()}
+    timings["total"] = round((now - getattr(_span_state, "start", _PROCESS_START)) * 1000, 2)
+    _span_state.timings = {}
+    _span_state.start = now
+    return timings
+
+
+def run_main(main):
+    """
+    Run a script's main(), under cProfile if BSD_CPROFILE=<path> is set
+    Stats are written to <path> and the top entries printed to stderr
+    """
+    profile_path = os.environ.get("BSD_CPROFILE")
+    if not profile_path:
+        return main()
+
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(main)
+    finally:
+        profiler.dump_stats(profile_path)
+        stats = pstats.Stats(profile_path, stream=sys.stderr)
+        stats.sort_stats("cumulative").print_stats(20)
+
+
+def call_with_deadline(func, timeout):
+    """
+    Run func() on a worker thread, waiting at most `timeout` seconds
+    (None or 0: just call it). The worker is a daemon thread, so a late call
+    never holds up the script's exit; span timings it recorded are added to
+    the caller's when it finishes in time.
+    Returns tuple of (finished, result)
+    """
+    if not timeout:
+        return True, func()
+
+    outcome = {}
+    done = threading.Event()
+
+    def worker():
+        try:
+            outcome["result"] = func()
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            outcome["timings"] = getattr(_span_state, "timings", {})
+            done.set()
+
+    threading.Thread(target=worker, daemon=True).start()
+    if not done.wait(timeout):
+        return False, None
+
+    timings = _thread_timings()
+    for name, elapsed in outcome["timings"].items():
+        timings[name] = timings.get(name, 0) + elapsed
+    if "error" in outcome:
+        raise outcome["error"]
+    return True, outcome["result"]
+
+
 def get_os():
     """Detect operating system"""
-    system = platform.system().lower()
-    if system == "darwin":
+    # sys.platform rather than the platform module, which is slow to import
+    if sys.platform == "darwin":
         return "mac"
-    elif system == "windows":
+    elif sys.platform == "win32":
         return "windows"
     return "linux"
 
@@ -40,6 +179,14 @@ def get_clipboard():
     Get text from clipboard - cross-platform
     Returns clipboard text or empty string on error
     """
+    with span("clipboard"):
+        return _read_clipboard()
+
+
+def _read_clipboard():
+    # Imported here so scripts that never read the clipboard don't pay for it
+    import subprocess
+
     os_type = get_os()
 
     try:
@@ -96,6 +243,15 @@ def load_config():
     Load configuration from config.json
     Falls back to environment variables and defaults
     """
+    with span("config_load"):
+        config = _load_config()
+
+    if config.get("profile_timings"):
+        enable_profiling()
+    return config
+
+
+def _load_config():
     config = {
         "provider": "gemini",
         "gemini_api_key": None,
@@ -104,6 +260,14 @@ def load_config():
         "log_usage": True,
         "log_responses": False,  # Privacy: don't log full responses by default
         "user_id": None,  # Set per-machine during install
+        "context_cache": True,  # Cache static prompt prefix (persona + KB) on Gemini
+        "routing_enabled": True,  # Try cheaper model first, escalate when unsure
+        "response_cache": True,  # Reuse replies for repeat questions (same KB)
+        "aggregate_usage": False,  # Sync static snippet uses as hourly counters
+        "split_questions": True,  # Answer multi-question messages part by part
+        "conversation_memory": True,  # Give follow-ups in a named chat (--chat) its earlier turns
+        "reply_deadline_s": 10,  # Answer from FAQ snippets if the model takes longer
+        "capture_mode": "full",  # "hashed": log question hash + redacted prefix only
     }
 
     # Load from config file if exists
@@ -142,7 +306,7 @@ def load_config():
     return config
 
 
-def log_usage(trigger, question=None, response=None, confidence=None, config=None):
+def log_usage(trigger, question=None, response=None, confidence=None, config=None, metrics=None):
     """
     Log usage locally (fast, reliable)
     Background sync process pushes to Supabase
@@ -153,6 +317,7 @@ def log_usage(trigger, question=None, response=None, confidence=None, config=Non
         response: The AI response (optional, only if log_responses=True)
         confidence: HIGH, MEDIUM, or LOW (optional)
         config: Config dict (will load if not provided)
+        metrics: Extra fields to record (e.g., prompt_tokens, cached_tokens)
     """
     if config is None:
         config = load_config()
@@ -169,17 +334,25 @@ def log_usage(trigger, question=None, response=None, confidence=None, config=Non
         "os": get_os(),
     }
 
-    # Only include question/response if configured
-    if question:
-        # Truncate very long questions
-        log_entry["question"] = question[:500] if len(question) > 500 else question
-
-    if response and config.get("log_responses"):
-        log_entry["response"] = response[:1000] if len(response) > 1000 else response
+    # Question text (or only its hash + a redacted prefix, see capture.py)
+    if question or response:
+        from capture import capture_question, capture_response
+        if question:
+            log_entry.update(capture_question(question, config))
+        response = capture_response(response, config) if response else None
+        if response:
+            log_entry["response"] = response
 
     if confidence:
         log_entry["confidence"] = confidence
 
+    if metrics:
+        log_entry.update(metrics)
+
+    timings = pop_timings()
+    if timings:
+        log_entry["timings"] = timings
+
     # Log locally (fast, ~1ms)
     log_local(log_entry)
 
@@ -202,9 +375,11 @@ def log_gap(question, confidence, topic=None, config=None):
     if config is None:
         config = load_config()
 
+    from capture import capture_question
+
     gap_entry = {
         "type": "gap",
-        "question": question[:500] if len(question) > 500 else question,
+        **capture_question(question, config),
         "confidence": confidence,
         "status": "new",
     }
@@ -213,7 +388,8 @@ def log_gap(question, confidence, topic=None, config=None):
         gap_entry["topic"] = topic[:100]  # Limit topic length
 
     # Log locally (fast, ~1ms)
-    log_local(gap_entry)
+    with span("log_write"):
+        log_local(gap_entry)
 
 
 def parse_confidence(response_text):
@@ -258,3 +434,100 @@ def get_knowledge_base_path():
 
     # Default: relative to project
     return os.path.join(PROJECT_DIR, "knowledge", "faq.md")
+
+
+# --- Install upgrade ---------------------------------------------------------
+# Installs set up before sync_snippets.py synced itself still run the original
+# sync, which only fetches eight fixed files: it updates reply.py and utils.py
+# but none of the modules they now import (or log_trigger.sh). An install is
+# upgraded once release_bundle.py (the current sync can't run without it)
+# exists and no upgrade is pending: the pending marker is written before the
+# upgrade touches anything and removed only after its sync succeeded, so an
+# interrupted or partial upgrade is retried.
+
+BOOTSTRAP_FILES = ["scripts/sync_snippets.py", "scripts/release_bundle.py"]
+# Same defaults as sync_snippets.DEFAULT_CONFIG, which can't be imported here:
+# after an interrupted upgrade it is the new file without its release_bundle
+BOOTSTRAP_REPO = "Black-Sand-Distribution/bsd-salescopilot"
+BOOTSTRAP_BRANCH = "main"
+BOOTSTRAP_PENDING = os.path.join(SCRIPT_DIR, ".cache", "upgrade-pending")
+BOOTSTRAP_TIMEOUT = 300
+
+# A background upgrade isn't started again while one may still be running
+BOOTSTRAP_RETRY = BOOTSTRAP_TIMEOUT + 60
+
+
+def is_installed():
+    """True once the install runs the current, self-updating sync"""
+    return os.path.exists(os.path.join(SCRIPT_DIR, "release_bundle.py")) and not os.path.exists(BOOTSTRAP_PENDING)
+
+
+def ensure_installed(wait=True):
+    """
+    One-time upgrade of an install still on the original snippet sync
+    Fetches the current sync_snippets.py and runs it once; from then on it
+    syncs itself and every module. wait=False starts it in the background
+    (at most once per BOOTSTRAP_RETRY) and returns at once - use it on hot paths.
+    """
+    if is_installed():
+        return
+
+    import subprocess
+
+    if not wait:
+        try:
+            if time.time() - os.path.getmtime(BOOTSTRAP_PENDING) < BOOTSTRAP_RETRY:
+                return
+        except OSError:
+            pass
+        subprocess.Popen(
+            [sys.executable, "-c", "import utils; utils.ensure_installed()"],
+            cwd=SCRIPT_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+        return
+
+    import urllib.request
+
+    config = load_config()
+    repo = config.get("github_repo", BOOTSTRAP_REPO)
+    branch = config.get("github_branch", BOOTSTRAP_BRANCH)
+    headers = {"User-Agent": "BSD-SalesCopilot-Sync/1.0"}
+    if config.get("github_token"):
+        headers["Authorization"] = f"token {config['github_token']}"
+
+    try:
+        os.makedirs(os.path.dirname(BOOTSTRAP_PENDING), exist_ok=True)
+        with open(BOOTSTRAP_PENDING, "w") as f:
+            f.write(f"{time.time():.0f}\n")
+
+        # Both files must download and compile before either is written, so
+        # an error page or truncated response never replaces the sync
+        downloads = []
+        for filepath in BOOTSTRAP_FILES:
+            url = f"https://raw.githubusercontent.com/{repo}/{branch}/{filepath}"
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers), timeout=30) as response:
+                data = response.read()
+            compile(data, filepath, "exec")
+            downloads.append((filepath, data))
+
+        for filepath, data in downloads:
+            target = os.path.join(PROJECT_DIR, filepath)
+            with open(target + ".sync-tmp", "wb") as f:
+                f.write(data)
+            os.replace(target + ".sync-tmp", target)
+
+        # Exits non-zero unless every file synced
+        result = subprocess.run(
+            [sys.executable, os.path.join(SCRIPT_DIR, "sync_snippets.py"), "--no-restart"],
+            timeout=BOOTSTRAP_TIMEOUT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"sync exited with {result.returncode}")
+        os.remove(BOOTSTRAP_PENDING)
+    except Exception as e:
+        print(f"Warning: Could not upgrade snippet sync: {e}", file=sys.stderr)
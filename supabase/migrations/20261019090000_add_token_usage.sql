@@ -0,0 +1,19 @@
+-- Track prompt/cached/output tokens per AI call
+-- cached_tokens are served from Gemini's context cache (static persona + KB prefix)
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS prompt_tokens INT;
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS cached_tokens INT;
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS output_tokens INT;
+
+-- Daily context cache savings (share of prompt tokens served from cache)
+CREATE OR REPLACE VIEW context_cache_savings AS
+SELECT
+    DATE_TRUNC('day', timestamp) as day,
+    trigger,
+    COUNT(*) as calls,
+    SUM(prompt_tokens) as prompt_tokens,
+    SUM(cached_tokens) as cached_tokens,
+    ROUND(100.0 * SUM(cached_tokens) / NULLIF(SUM(prompt_tokens), 0), 1) as cached_pct
+FROM usage_logs
+WHERE prompt_tokens IS NOT NULL
+GROUP BY DATE_TRUNC('day', timestamp), trigger
+ORDER BY day DESC;
@@ -0,0 +1,25 @@
+-- Model routing metrics: which tier answered, whether it escalated, latency and cost
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS model TEXT;
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS tier TEXT;
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS escalated BOOLEAN;
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS latency_ms INT;
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS cost_usd NUMERIC(12, 8);
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS tier_metrics JSONB;
+
+CREATE INDEX IF NOT EXISTS idx_usage_logs_tier ON usage_logs(tier);
+
+-- Per-tier latency/cost, one row per model call (including escalated-from calls)
+CREATE OR REPLACE VIEW tier_performance AS
+SELECT
+    DATE_TRUNC('day', u.timestamp) as day,
+    t->>'tier' as tier,
+    t->>'model' as model,
+    COUNT(*) as calls,
+    ROUND(AVG((t->>'latency_ms')::INT)) as avg_latency_ms,
+    PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY (t->>'latency_ms')::INT) as p95_latency_ms,
+    SUM((t->>'cost_usd')::NUMERIC) as cost_usd,
+    COUNT(*) FILTER (WHERE t->>'confidence' IN ('MEDIUM', 'LOW') OR t->>'rejected' IS NOT NULL) as escalation_triggers
+FROM usage_logs u, jsonb_array_elements(u.tier_metrics) t
+WHERE u.tier_metrics IS NOT NULL
+GROUP BY DATE_TRUNC('day', u.timestamp), t->>'tier', t->>'model'
+ORDER BY day DESC, tier;
@@ -0,0 +1,2 @@
+-- Replies served from the local response cache (no model call)
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS cache_hit BOOLEAN;
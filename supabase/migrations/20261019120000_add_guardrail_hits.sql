@@ -0,0 +1,2 @@
+-- Output guardrail rules that fired on a reply (see knowledge/guardrails.json)
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS guardrail_hits TEXT[];
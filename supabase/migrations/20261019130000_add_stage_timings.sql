@@ -0,0 +1,17 @@
+-- Per-stage timings (ms) recorded when profiling is enabled (BSD_PROFILE=1)
+-- e.g. {"clipboard": 4.1, "config_load": 0.6, "kb_load": 2.3, "model_wait": 812.0, "total": 870.2}
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS timings JSONB;
+
+-- Average / p95 duration per trigger and stage
+CREATE OR REPLACE VIEW stage_timings AS
+SELECT
+    trigger,
+    t.key as stage,
+    COUNT(*) as samples,
+    ROUND(AVG(t.value::NUMERIC), 2) as avg_ms,
+    ROUND(PERCENTILE_CONT(0.95) WITHIN GROUP (ORDER BY t.value::NUMERIC)::NUMERIC, 2) as p95_ms
+FROM usage_logs, jsonb_each_text(timings) t
+WHERE timings IS NOT NULL
+  AND timestamp > NOW() - INTERVAL '30 days'
+GROUP BY trigger, t.key
+ORDER BY trigger, avg_ms DESC;
@@ -0,0 +1,74 @@
+-- Hourly counters for static snippet uses (sync_logs.py aggregate_usage mode)
+-- AI events keep a full row in usage_logs
+CREATE TABLE IF NOT EXISTS usage_counters (
+    id BIGSERIAL PRIMARY KEY,
+    trigger TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    os TEXT NOT NULL DEFAULT '',
+    hour TIMESTAMPTZ NOT NULL,
+    count INT NOT NULL DEFAULT 1,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    UNIQUE (trigger, user_id, os, hour)
+);
+
+CREATE INDEX IF NOT EXISTS idx_usage_counters_hour ON usage_counters(hour DESC);
+CREATE INDEX IF NOT EXISTS idx_usage_counters_trigger ON usage_counters(trigger);
+
+ALTER TABLE usage_counters ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Allow anonymous inserts to usage_counters"
+ON usage_counters FOR INSERT
+TO anon
+WITH CHECK (true);
+
+CREATE POLICY "Allow authenticated reads on usage_counters"
+ON usage_counters FOR SELECT
+TO authenticated
+USING (true);
+
+-- Merge re-synced buckets instead of inserting duplicates
+CREATE OR REPLACE FUNCTION add_usage_counts()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE usage_counters
+    SET count = count + NEW.count
+    WHERE trigger = NEW.trigger
+    AND user_id = NEW.user_id
+    AND os = NEW.os
+    AND hour = NEW.hour;
+
+    -- New bucket
+    IF NOT FOUND THEN
+        RETURN NEW;
+    END IF;
+
+    -- Existing bucket updated, don't insert new row
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS usage_counters_merge_trigger ON usage_counters;
+CREATE TRIGGER usage_counters_merge_trigger
+    BEFORE INSERT ON usage_counters
+    FOR EACH ROW
+    EXECUTE FUNCTION add_usage_counts();
+
+-- Weekly analytics now include the aggregated uses
+CREATE OR REPLACE VIEW weekly_usage AS
+SELECT
+    week,
+    trigger,
+    confidence,
+    SUM(count) as count
+FROM (
+    SELECT DATE_TRUNC('week', timestamp) as week, trigger, confidence, 1 as count
+    FROM usage_logs
+    WHERE timestamp > NOW() - INTERVAL '8 weeks'
+    UNION ALL
+    -- Aggregated static snippet uses (no confidence)
+    SELECT DATE_TRUNC('week', hour), trigger, NULL, count
+    FROM usage_counters
+    WHERE hour > NOW() - INTERVAL '8 weeks'
+) events
+GROUP BY week, trigger, confidence
+ORDER BY week DESC, count DESC;
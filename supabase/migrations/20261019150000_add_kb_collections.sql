@@ -0,0 +1,13 @@
+-- Knowledge base collections an AI reply was answered from (e.g. {faq,eu})
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS kb_collections TEXT[];
+
+-- How often each collection is pulled in
+CREATE OR REPLACE VIEW kb_collection_usage AS
+SELECT
+    c.name as collection,
+    COUNT(*) as replies,
+    COUNT(*) FILTER (WHERE confidence = 'HIGH') as high_confidence
+FROM usage_logs, UNNEST(kb_collections) c(name)
+WHERE timestamp > NOW() - INTERVAL '30 days'
+GROUP BY c.name
+ORDER BY replies DESC;
@@ -0,0 +1,3 @@
+-- Number of separate questions detected in a multi-question customer message
+-- (each unsure part is logged as its own gap); NULL for single questions
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS sub_questions INT;
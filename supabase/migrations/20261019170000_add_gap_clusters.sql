@@ -0,0 +1,21 @@
+-- Paraphrase clusters from scripts/cluster_gaps.py --supabase --write
+-- cluster_id is the smallest gap id in the cluster; cluster_label its representative question
+ALTER TABLE gaps ADD COLUMN IF NOT EXISTS cluster_id BIGINT;
+ALTER TABLE gaps ADD COLUMN IF NOT EXISTS cluster_label TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_gaps_cluster ON gaps(cluster_id);
+
+-- Open clusters ranked by how often they're asked - fix the top ones first
+CREATE OR REPLACE VIEW top_gap_clusters AS
+SELECT
+    cluster_id,
+    MAX(cluster_label) as question,
+    SUM(frequency) as asks,
+    COUNT(*) as paraphrases,
+    MAX(last_seen) as last_seen
+FROM gaps
+WHERE cluster_id IS NOT NULL
+  AND status IN ('new', 'reviewed')
+GROUP BY cluster_id
+ORDER BY asks DESC, last_seen DESC
+LIMIT 50;
@@ -0,0 +1,18 @@
+-- AI replies answered from the FAQ snippets because the model was too slow
+-- ('timeout') or failed ('error'), and which snippet was used (e.g. ';moq')
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS fallback TEXT;
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS fallback_trigger TEXT;
+
+-- Daily share of replies that fell back - a rising rate means the model is struggling
+CREATE OR REPLACE VIEW reply_fallbacks AS
+SELECT
+    DATE_TRUNC('day', timestamp) as day,
+    COUNT(*) as replies,
+    COUNT(*) FILTER (WHERE fallback = 'timeout') as timeouts,
+    COUNT(*) FILTER (WHERE fallback = 'error') as errors,
+    ROUND(100.0 * COUNT(fallback) / COUNT(*), 1) as fallback_pct
+FROM usage_logs
+WHERE trigger = ';reply'
+  AND timestamp > NOW() - INTERVAL '30 days'
+GROUP BY 1
+ORDER BY 1 DESC;
@@ -0,0 +1,31 @@
+-- Hash of the normalized question (see scripts/capture.py). With
+-- "capture_mode": "hashed" only the hash and a short redacted prefix are
+-- logged, so repeats are counted and gaps deduplicated by hash
+ALTER TABLE usage_logs ADD COLUMN IF NOT EXISTS question_hash TEXT;
+ALTER TABLE gaps ADD COLUMN IF NOT EXISTS question_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_usage_logs_question_hash ON usage_logs(question_hash);
+CREATE INDEX IF NOT EXISTS idx_gaps_question_hash ON gaps(question_hash);
+
+-- Gap dedup: by hash when the new gap has one (older rows without a hash
+-- still match on exact text), else by exact text as before
+CREATE OR REPLACE FUNCTION update_gap_frequency()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE gaps
+    SET frequency = frequency + 1,
+        last_seen = NOW()
+    WHERE status != 'added'
+    AND (
+        (NEW.question_hash IS NOT NULL AND question_hash = NEW.question_hash)
+        OR (question_hash IS NULL AND question = NEW.question)
+        OR (NEW.question_hash IS NULL AND question = NEW.question)
+    );
+
+    IF NOT FOUND THEN
+        RETURN NEW;
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,11 @@
+-- The BEFORE INSERT merge triggers ran as the inserting role. Clients sync
+-- with the anon key, which may only INSERT, so the trigger's UPDATE of an
+-- existing row matched nothing:
+--   - usage_counters: a second sync within the same hour then violated
+--     UNIQUE (trigger, user_id, os, hour) and the whole counters POST failed
+--   - gaps: a repeated question was inserted as a new row instead of
+--     bumping frequency
+-- Run both as the function owner, which bypasses RLS. search_path is pinned
+-- so the definer functions only ever resolve public tables.
+ALTER FUNCTION add_usage_counts() SECURITY DEFINER SET search_path = public;
+ALTER FUNCTION update_gap_frequency() SECURITY DEFINER SET search_path = public;
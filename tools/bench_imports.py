@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Import-time benchmark for the Espanso entry scripts
+Every trigger starts a fresh Python process, so module imports are paid on
+each keystroke. Runs `python3 -X importtime -c "import <script>"` a few times
+per entry script and reports the best cumulative import time, the slowest
+imports, and any heavy module pulled in before it is needed.
+
+Usage: python3 tools/bench_imports.py [--runs 5] [--top 5] [--check] [module ...]
+  - No modules: benchmark every entry script in ENTRY_MODULES
+  - --check: exit 1 if an entry script imports one of its deferred modules
+    (or exceeds --budget-ms, if given) - run before merging import changes
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_DIR = os.path.join(os.path.dirname(TOOLS_DIR), "scripts")
+
+# Modules that must only be imported once the script actually needs them
+NETWORK = {"http.client", "ssl", "urllib.request"}
+CLIPBOARD = {"subprocess", "platform"}
+
+# Entry script -> modules it must not import at startup
+ENTRY_MODULES = {
+    "log_snippet": NETWORK | CLIPBOARD | {"datetime", "hashlib"},
+    "polish": NETWORK | CLIPBOARD,
+    "reply": NETWORK | CLIPBOARD,
+}
+
+
+def parse_importtime(stderr):
+    """[(name, self_us, cumulative_us)] from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = [f.strip() for f in line[len("import time:"):].split("|")]
+        if len(fields) != 3 or not fields[0].isdigit():
+            continue  # header line
+        rows.append((fields[2], int(fields[0]), int(fields[1])))
+    return rows
+
+
+def measure(module):
+    """One cold import of a script in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SCRIPT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return parse_importtime(result.stderr)
+
+
+def benchmark(module, runs):
+    """
+    Best of `runs` imports (after a warm-up that writes .pyc files)
+    Returns tuple of (cumulative_ms, rows_of_best_run)
+    """
+    measure(module)
+    best = None
+    for _ in range(runs):
+        rows = measure(module)
+        total = next(cum for name, _, cum in reversed(rows) if name == module)
+        if best is None or total < best[0]:
+            best = (total, rows)
+    return best[0] / 1000, best[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup import time of the entry scripts")
+    parser.add_argument("modules", nargs="*", help="Entry scripts to benchmark (default: all)")
+    parser.add_argument("--runs", type=int, default=5, help="Imports per script (best is kept)")
+    parser.add_argument("--top", type=int, default=5, help="Slowest imports to list per script")
+    parser.add_argument("--check", action="store_true", help="Fail on deferred modules imported at startup")
+    parser.add_argument("--budget-ms", type=float, help="With --check, fail if a script is slower than this")
+    args = parser.parse_args()
+
+    failures = []
+    for module in args.modules or list(ENTRY_MODULES):
+        try:
+            total_ms, rows = benchmark(module, args.runs)
+        except RuntimeError as e:
+            print(f"Error: Could not import {module}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        imported = {name.strip() for name, _, _ in rows}
+        early = sorted(imported & ENTRY_MODULES.get(module, set()))
+        print(f"{module:12} {total_ms:7.1f} ms  ({len(rows)} modules)")
+        for name, self_us, _ in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+            print(f"{'':14}{self_us / 1000:5.1f} ms  {name.strip()}")
+        if early:
+            print(f"{'':14}imported before needed: {', '.join(early)}")
+            failures.append(f"{module} imports {', '.join(early)}")
+        if args.budget_ms and total_ms > args.budget_ms:
+            failures.append(f"{module} takes {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+
+    if args.check:
+        if failures:
+            for failure in failures:
+                print(f"FAIL: {failure}", file=sys.stderr)
+            sys.exit(1)
+        print("Check: OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Regression check for the FAQ-snippet fallback
+Runs questions with a known right answer through fallback.find_snippet()
+against the real match/faq.yml: questions a snippet answers must get it,
+questions none of them answers must get the "let me check" reply (None),
+never a confidently wrong snippet.
+
+Usage: python3 tools/check_fallback.py [--check]
+  - Prints the snippet (and best BM25 score) picked for each question
+  - --check: exit 1 if any question gets the wrong snippet - run after
+    changing the tokenizer, the thresholds or faq snippet descriptions
+"""
+
+import argparse
+import os
+import sys
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_DIR = os.path.join(os.path.dirname(TOOLS_DIR), "scripts")
+sys.path.insert(0, SCRIPT_DIR)
+
+import fallback
+
+# Question -> trigger it must fall back to (None: no snippet answers it)
+CASES = {
+    "what's your minimum order": ";moq",
+    "what is the minimum order quantity": ";moq",
+    "What’s your MOQ?": ";moq",
+    "what are your payment terms": ";terms",
+    "do you offer DDP": ";noddp",
+    "what documents do you provide": ";docs",
+    "how long is the lead time": ";leadtime",
+    "Can I pay with a letter of credit?": ";nolc",
+    "can I get access to the portal": ";portal",
+    # Single weak term ("s" from "what's", "delivery") used to pick a snippet
+    "what's the price of red bull": None,
+    "how long does delivery take": None,
+    "what's the weather like": None,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check which FAQ snippet questions fall back to")
+    parser.add_argument("--check", action="store_true", help="Fail if any question gets the wrong snippet")
+    args = parser.parse_args()
+
+    index = fallback.SnippetIndex()
+    if index.refresh() is None:
+        print(f"Error: {fallback.SNIPPETS_PATH} not found", file=sys.stderr)
+        sys.exit(1)
+
+    failures = []
+    for question, expected in CASES.items():
+        snippet = fallback.find_snippet(question)
+        got = snippet[0] if snippet else None
+        best = index.search(question, k=1)
+        score = f"{best[0][1]:5.2f}" if best else "    -"
+        mark = "ok" if got == expected else "FAIL"
+        print(f"{mark:4}  {score}  {str(got):10}  {question}")
+        if got != expected:
+            failures.append(f"{question!r} -> {got} (expected {expected})")
+
+    if args.check:
+        if failures:
+            for failure in failures:
+                print(f"FAIL: {failure}", file=sys.stderr)
+            sys.exit(1)
+        print("Check: OK")
+
+
+if __name__ == "__main__":
+    main()
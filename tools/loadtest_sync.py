@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Load test for the log sync path against the local Supabase stub
+Simulates many reps' machines syncing their backlogs at the same time, each
+through the real sync_logs.sync_to_supabase() with its own keep-alive pool,
+and reports end-to-end ingest throughput. Each backlog is sent in --syncs
+consecutive syncs, so repeated gaps and usage_counters buckets within the
+same hour go through the merge triggers (as anon, under the stub's RLS).
+
+Usage: python3 tools/loadtest_sync.py [--reps 300] [--entries 50] [--concurrency 100]
+                                      [--gap-rate 0.2] [--latency-ms 5] [--jitter-ms 0]
+                                      [--fail-rate 0.0] [--syncs 2] [--aggregate] [--url URL]
+  - Without --url an in-process stub is started on a random port
+  - With --url, points at an already running stub (or a staging project)
+  - --aggregate: sync with aggregate_usage on (static uses as hourly counters)
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from urllib.request import urlopen
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+SCRIPT_DIR = os.path.join(os.path.dirname(TOOLS_DIR), "scripts")
+sys.path.insert(0, TOOLS_DIR)
+sys.path.insert(0, SCRIPT_DIR)
+
+from http_pool import ConnectionPool
+from supabase_stub import start_server
+import sync_logs
+
+TRIGGERS = [";hi", ";thanks", ";ship", ";pricing", ";reply", ";polish", ";moq", ";samples"]
+
+# Small pool of questions so gap dedup actually gets exercised
+GAP_QUESTIONS = [f"Do you ship to region {n}?" for n in range(40)]
+
+
+def make_backlog(rep, entries, gap_rate):
+    """One rep's pending local log, shaped like local_log entries"""
+    backlog = []
+    for _ in range(entries):
+        timestamp = datetime.now(timezone.utc).isoformat()
+        if random.random() < gap_rate:
+            backlog.append({
+                "type": "gap",
+                "question": random.choice(GAP_QUESTIONS),
+                "confidence": random.choice(["LOW", "MEDIUM"]),
+                "timestamp": timestamp,
+            })
+            continue
+
+        trigger = random.choice(TRIGGERS)
+        entry = {"type": "usage", "trigger": trigger, "timestamp": timestamp, "user_id": f"rep-{rep}"}
+        if trigger == ";reply":
+            entry.update({
+                "question": "What is your MOQ?",
+                "response": "Our MOQ is 500 units.",
+                "confidence": "HIGH",
+                "model": "gemini-2.0-flash-lite",
+                "tier": "fast",
+                "latency_ms": random.randint(300, 1500),
+                "timings": {"total": 812.4, "model_wait": 640.1},
+            })
+        backlog.append(entry)
+    return backlog
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync load test against the Supabase stub")
+    parser.add_argument("--reps", type=int, default=300, help="Simulated machines")
+    parser.add_argument("--entries", type=int, default=50, help="Backlog entries per rep")
+    parser.add_argument("--concurrency", type=int, default=100, help="Reps syncing at once")
+    parser.add_argument("--gap-rate", type=float, default=0.2, help="Fraction of entries that are gaps")
+    parser.add_argument("--latency-ms", type=float, default=5, help="Stub latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Stub latency jitter")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Stub 503 rate")
+    parser.add_argument("--syncs", type=int, default=2, help="Syncs each rep's backlog is split into")
+    parser.add_argument("--aggregate", action="store_true", help="Sync with aggregate_usage on")
+    parser.add_argument("--url", help="Use an already running stub instead of starting one")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if not url:
+        server, url = start_server(
+            latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, fail_rate=args.fail_rate
+        )
+
+    config = {
+        "supabase_url": url,
+        "supabase_anon_key": "loadtest",
+        "user_id": "loadtest",
+        "aggregate_usage": args.aggregate,
+    }
+    backlogs = [make_backlog(rep, args.entries, args.gap_rate) for rep in range(args.reps)]
+    total = sum(len(b) for b in backlogs)
+    gaps_sent = sum(1 for b in backlogs for e in b if e["type"] == "gap")
+    distinct_gaps = len({e["question"] for b in backlogs for e in b if e["type"] == "gap"})
+    static_uses = sum(1 for b in backlogs for e in b if set(e) <= sync_logs.STATIC_FIELDS)
+
+    durations = []
+    failed = []
+    lock = threading.Lock()
+
+    def sync_rep(backlog):
+        # Each rep is its own machine: own pool, own connection
+        pool = ConnectionPool(timeout=30)
+        start = time.perf_counter()
+        size = -(-len(backlog) // max(1, args.syncs))
+        failures = []
+        try:
+            for i in range(0, len(backlog), size):
+                failures += sync_logs.sync_to_supabase(backlog[i:i + size], config, pool=pool)[1]
+        finally:
+            pool.close()
+        with lock:
+            durations.append(time.perf_counter() - start)
+            failed.extend(failures)
+
+    print(f"Syncing {total} entries from {args.reps} reps ({args.concurrency} at once) to {url}")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(sync_rep, backlogs))
+    elapsed = time.perf_counter() - start
+
+    synced = total - len(failed)
+    print(f"Elapsed:     {elapsed:.2f}s")
+    print(f"Throughput:  {synced / elapsed:.0f} rows/s")
+    print(f"Per rep:     p50 {percentile(durations, 50):.2f}s, p95 {percentile(durations, 95):.2f}s, "
+          f"max {max(durations):.2f}s")
+    print(f"Synced:      {synced}/{total} ({len(failed)} failed, would be archived for retry)")
+
+    with urlopen(f"{url}/stats", timeout=10) as response:
+        stats = json.loads(response.read())
+    print(f"Stub:        {json.dumps(stats)}")
+
+    if server:
+        server.shutdown()
+
+        # With no injected failures nothing may fail, and the stub must hold
+        # every usage row and one row per distinct gap
+        if not args.fail_rate:
+            usage_rows = total - gaps_sent
+            if args.aggregate:
+                usage_rows -= static_uses
+            expected = {"failed": 0, "usage_logs": usage_rows, "gaps": distinct_gaps}
+            if args.aggregate:
+                expected["usage_counters.count"] = static_uses
+            actual = dict(stats["tables"])
+            actual["failed"] = len(failed)
+            actual["usage_counters.count"] = server.db.total("usage_counters", "count")
+            ok = all(actual[t] == n for t, n in expected.items())
+            print(f"Check:       {'OK' if ok else 'MISMATCH'} (expected {expected})")
+            if not ok:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
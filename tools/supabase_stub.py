@@ -0,0 +1,495 @@
+#!/usr/bin/env python3
+"""
+Local Supabase/PostgREST stand-in for offline testing of the sync path
+Backed by SQLite; implements just what sync_logs.py uses:
+
+  POST  /rest/v1/<table>  single object or array of objects
+  GET   /rest/v1/<table>  col=eq.X / col=in.(a,b) filters, order, limit, offset
+  PATCH /rest/v1/<table>  same filters (cluster_gaps.py --write)
+  GET   /stats            row counts + request counters
+
+The table schema is read from db/supabase-setup.sql plus supabase/migrations,
+so unknown columns are rejected with 400 just like PostgREST, and UNIQUE
+constraints are enforced (409). Inserts follow the setup SQL's BEFORE INSERT
+triggers: a repeated gap question (not yet 'added') bumps frequency/last_seen,
+and a repeated usage_counters bucket adds its count, instead of creating a row.
+
+Row level security follows the SQL's policies too. Requests with the
+--service-key bypass it; any other key is anon, which needs a policy for each
+operation (a missing INSERT policy is a 403, missing SELECT/UPDATE policies
+match no rows). The merge triggers run as anon unless their function is
+SECURITY DEFINER, exactly like Postgres.
+
+Usage: python3 tools/supabase_stub.py [--port 54321] [--db stub.sqlite]
+                                      [--latency-ms 0] [--jitter-ms 0]
+                                      [--fail-rate 0.0] [--rate-limit-rate 0.0]
+                                      [--service-key KEY] [--no-migrations]
+  - --no-migrations: schema and policies from the setup SQL only, like a
+    project that hasn't applied supabase/migrations
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(TOOLS_DIR)
+SETUP_SQL = os.path.join(PROJECT_DIR, "db", "supabase-setup.sql")
+MIGRATIONS_GLOB = os.path.join(PROJECT_DIR, "supabase", "migrations", "*.sql")
+
+# Columns filled in by the database, never sent by clients
+SERVER_COLUMNS = {"id", "created_at"}
+
+# Table -> function its BEFORE INSERT merge trigger runs (mirrored in insert())
+MERGE_TRIGGERS = {"gaps": "update_gap_frequency", "usage_counters": "add_usage_counts"}
+
+
+def _migration_files(migrations=True):
+    return sorted(glob.glob(MIGRATIONS_GLOB)) if migrations else []
+
+
+def _sql_files(migrations=True):
+    """Setup SQL first, then migrations in order"""
+    return [SETUP_SQL] + _migration_files(migrations)
+
+
+def load_schema(migrations=True):
+    """
+    {table: [column, ...]} and {table: [(unique column, ...), ...]} from the
+    setup SQL + migrations (migrations=False: a project that never applied them)
+    Only the column names matter here - SQLite stores anything
+    """
+    schema = {}
+    uniques = {}
+
+    with open(SETUP_SQL, "r") as f:
+        setup = f.read()
+    for table, body in re.findall(r"CREATE TABLE IF NOT EXISTS (\w+) \((.*?)\n\);", setup, re.S):
+        columns = []
+        for line in body.split("\n"):
+            match = re.match(r"\s*(\w+)\s+[A-Z]", line)
+            if match and match.group(1).upper() not in ("PRIMARY", "UNIQUE", "CONSTRAINT"):
+                columns.append(match.group(1))
+        schema[table] = columns
+        uniques[table] = [
+            tuple(c.strip() for c in group.split(","))
+            for group in re.findall(r"^\s*UNIQUE \(([^)]*)\)", body, re.M)
+        ]
+
+    for path in _migration_files(migrations):
+        with open(path, "r") as f:
+            sql = f.read()
+        for table, column in re.findall(r"ALTER TABLE (\w+) ADD COLUMN IF NOT EXISTS (\w+)", sql):
+            if column not in schema.setdefault(table, []):
+                schema[table].append(column)
+
+    return schema, uniques
+
+
+def load_security(migrations=True):
+    """
+    Row level security as the SQL leaves it, in file order
+    Returns tuple of ({table: {operation: {role, ...}}}, {function: is_security_definer});
+    tables without RLS enabled are absent from the policies dict
+    """
+    policies = {}
+    definer = {}
+
+    for path in _sql_files(migrations):
+        with open(path, "r") as f:
+            sql = f.read()
+        statements = []
+        for match in re.finditer(r"ALTER TABLE (\w+) ENABLE ROW LEVEL SECURITY", sql):
+            statements.append((match.start(), "rls", match.group(1), None))
+        for match in re.finditer(r'CREATE POLICY "[^"]*"\s+ON (\w+)\s+FOR (\w+)\s+TO (\w+)', sql):
+            statements.append((match.start(), "policy", match.group(1), (match.group(2).upper(), match.group(3))))
+        for match in re.finditer(r"CREATE OR REPLACE FUNCTION (\w+)\(\).*?\$\$ LANGUAGE plpgsql([^;]*);", sql, re.S):
+            statements.append((match.start(), "function", match.group(1), "SECURITY DEFINER" in match.group(2)))
+        for match in re.finditer(r"ALTER FUNCTION (\w+)\(\) SECURITY (DEFINER|INVOKER)", sql):
+            statements.append((match.start(), "function", match.group(1), match.group(2) == "DEFINER"))
+
+        for _, kind, name, value in sorted(statements):
+            if kind == "rls":
+                policies.setdefault(name, {})
+            elif kind == "policy":
+                operations = ("SELECT", "INSERT", "UPDATE", "DELETE") if value[0] == "ALL" else (value[0],)
+                for operation in operations:
+                    policies.setdefault(name, {}).setdefault(operation, set()).add(value[1])
+            else:
+                definer[name] = value
+
+    return policies, definer
+
+
+class StubDatabase:
+    """SQLite store with PostgREST-ish insert semantics"""
+
+    def __init__(self, path=":memory:", migrations=True):
+        self.schema, uniques = load_schema(migrations)
+        self.policies, self.definer = load_security(migrations)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock:
+            for table, columns in self.schema.items():
+                cols = ", ".join(f'"{c}"' for c in columns if c != "id")
+                constraints = "".join(
+                    ", UNIQUE (" + ", ".join(f'"{c}"' for c in unique) + ")" for unique in uniques.get(table, [])
+                )
+                self.conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{table}" (id INTEGER PRIMARY KEY AUTOINCREMENT, {cols}{constraints})'
+                )
+            self.conn.commit()
+
+    def allows(self, role, table, operation):
+        """Whether RLS lets `role` perform `operation` on `table`"""
+        if role == "service_role" or table not in self.policies:
+            return True
+        return role in self.policies[table].get(operation, set())
+
+    def insert(self, table, rows, role="anon"):
+        """
+        Insert rows (all or nothing), applying table-specific triggers
+        Returns (status, error_message)
+        """
+        if table not in self.schema:
+            return 404, f"relation \"public.{table}\" does not exist"
+        if not self.allows(role, table, "INSERT"):
+            return 403, f"new row violates row-level security policy for table \"{table}\""
+
+        allowed = set(self.schema[table]) - SERVER_COLUMNS
+        for row in rows:
+            unknown = set(row) - allowed
+            if unknown:
+                return 400, f"Could not find the '{sorted(unknown)[0]}' column of '{table}' in the schema cache"
+
+        # The merge trigger runs as the caller, unless it is SECURITY DEFINER
+        trigger = MERGE_TRIGGERS.get(table)
+        trigger_role = "service_role" if self.definer.get(trigger) else role
+        merge = self.allows(trigger_role, table, "UPDATE") and self.allows(trigger_role, table, "SELECT")
+
+        now = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        with self.lock:
+            try:
+                for row in rows:
+                    row = {
+                        k: json.dumps(v) if isinstance(v, (dict, list)) else v
+                        for k, v in row.items()
+                    }
+                    row.setdefault("created_at", now)
+
+                    if table == "gaps":
+                        if merge and self._bump_gap(row, now):
+                            continue
+                        row.setdefault("frequency", 1)
+                        row.setdefault("status", "new")
+                    elif table == "usage_counters":
+                        if merge and self._add_counts(row):
+                            continue
+
+                    cols = ", ".join(f'"{c}"' for c in row)
+                    marks = ", ".join("?" for _ in row)
+                    self.conn.execute(f'INSERT INTO "{table}" ({cols}) VALUES ({marks})', list(row.values()))
+            except sqlite3.IntegrityError as e:
+                self.conn.rollback()
+                return 409, f"duplicate key value violates unique constraint on \"{table}\" ({e})"
+            self.conn.commit()
+        return 201, None
+
+    def _bump_gap(self, row, now):
+        """Mirror of update_gap_frequency(): True if an existing gap absorbed this one"""
+        if "question_hash" not in self.schema["gaps"]:
+            # The setup SQL's version, before the question_hash migration
+            cur = self.conn.execute(
+                "UPDATE gaps SET frequency = frequency + 1, last_seen = ? WHERE status != 'added' AND question = ?",
+                (now, row.get("question")),
+            )
+            return cur.rowcount > 0
+        cur = self.conn.execute(
+            "UPDATE gaps SET frequency = frequency + 1, last_seen = ? "
+            "WHERE status != 'added' AND ("
+            "(? IS NOT NULL AND question_hash = ?) "
+            "OR (question_hash IS NULL AND question = ?) "
+            "OR (? IS NULL AND question = ?))",
+            (now, row.get("question_hash"), row.get("question_hash"), row.get("question"),
+             row.get("question_hash"), row.get("question")),
+        )
+        return cur.rowcount > 0
+
+    def _add_counts(self, row):
+        """Mirror of add_usage_counts(): True if an existing bucket absorbed this one"""
+        cur = self.conn.execute(
+            "UPDATE usage_counters SET count = count + ? "
+            "WHERE trigger = ? AND user_id = ? AND os = ? AND hour = ?",
+            (row.get("count", 1), row.get("trigger"), row.get("user_id"), row.get("os", ""), row.get("hour")),
+        )
+        return cur.rowcount > 0
+
+    def total(self, table, column):
+        """SUM(column) - for checking aggregated counts"""
+        with self.lock:
+            return self.conn.execute(f'SELECT COALESCE(SUM("{column}"), 0) FROM "{table}"').fetchone()[0]
+
+    def _where(self, table, filters):
+        """SQL WHERE clause + params for PostgREST eq./in. filters"""
+        clauses, params = [], []
+        for column, value in filters.items():
+            if column not in self.schema[table]:
+                raise ValueError(f"Unknown column {column}")
+            if value.startswith("eq."):
+                clauses.append(f'"{column}" = ?')
+                params.append(value[3:])
+            elif value.startswith("in.(") and value.endswith(")"):
+                items = value[4:-1].split(",")
+                clauses.append(f'"{column}" IN ({", ".join("?" for _ in items)})')
+                params += items
+            else:
+                raise ValueError(f"Unsupported filter {column}={value}")
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def select(self, table, filters=None, order="id", limit=100, offset=0, role="anon"):
+        if table not in self.schema:
+            return None
+        if not self.allows(role, table, "SELECT"):
+            return []  # RLS hides every row
+        where, params = self._where(table, filters or {})
+        order = order.split(".")[0] if order.split(".")[0] in self.schema[table] else "id"
+        with self.lock:
+            cur = self.conn.execute(
+                f'SELECT * FROM "{table}"{where} ORDER BY "{order}" LIMIT ? OFFSET ?',
+                params + [limit, offset],
+            )
+            names = [d[0] for d in cur.description]
+            return [dict(zip(names, r)) for r in cur.fetchall()]
+
+    def update(self, table, filters, values, role="anon"):
+        """Returns (status, error_message)"""
+        if table not in self.schema:
+            return 404, f"relation \"public.{table}\" does not exist"
+        unknown = set(values) - set(self.schema[table])
+        if unknown:
+            return 400, f"Could not find the '{sorted(unknown)[0]}' column of '{table}' in the schema cache"
+        if not (self.allows(role, table, "UPDATE") and self.allows(role, table, "SELECT")):
+            return 204, None  # RLS: no visible rows to update
+        where, params = self._where(table, filters)
+        sets = ", ".join(f'"{c}" = ?' for c in values)
+        with self.lock:
+            self.conn.execute(f'UPDATE "{table}" SET {sets}{where}', list(values.values()) + params)
+            self.conn.commit()
+        return 204, None
+
+    def counts(self):
+        with self.lock:
+            return {
+                table: self.conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+                for table in self.schema
+            }
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, db, latency_ms=0, jitter_ms=0, fail_rate=0.0, rate_limit_rate=0.0, service_key=None):
+        super().__init__(address, StubHandler)
+        self.db = db
+        self.service_key = service_key
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.fail_rate = fail_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.stats = {"requests": 0, "rows": 0, "injected_failures": 0, "rejected": 0}
+        self.stats_lock = threading.Lock()
+
+    def bump(self, key, n=1):
+        with self.stats_lock:
+            self.stats[key] += n
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real thing
+
+    def log_message(self, *args):
+        pass  # Quiet - load tests make a lot of requests
+
+    def _send(self, status, payload=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _role(self):
+        """service_role for the service key, anon for any other key"""
+        key = self.headers.get("apikey")
+        return "service_role" if key and key == self.server.service_key else "anon"
+
+    def _table(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if not path.startswith("/rest/v1/"):
+            return None
+        return path[len("/rest/v1/"):].strip("/")
+
+    def _inject(self):
+        """Simulated latency/failures. Returns True if the request was failed"""
+        server = self.server
+        delay = server.latency_ms + random.uniform(-server.jitter_ms, server.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        roll = random.random()
+        if roll < server.fail_rate:
+            server.bump("injected_failures")
+            self._send(503, {"message": "Injected failure"})
+            return True
+        if roll < server.fail_rate + server.rate_limit_rate:
+            server.bump("injected_failures")
+            self._send(429, {"message": "Injected rate limit"})
+            return True
+        return False
+
+    def do_POST(self):
+        self.server.bump("requests")
+        length = int(self.headers.get("Content-Length", 0))
+        raw = self.rfile.read(length)
+
+        if not self.headers.get("apikey"):
+            self._send(401, {"message": "No API key found in request"})
+            return
+
+        table = self._table()
+        if table is None:
+            self._send(404, {"message": "Not found"})
+            return
+
+        if self._inject():
+            return
+
+        try:
+            payload = json.loads(raw or b"null")
+        except json.JSONDecodeError as e:
+            self._send(400, {"message": f"Invalid JSON: {e}"})
+            return
+
+        rows = payload if isinstance(payload, list) else [payload]
+        if not all(isinstance(r, dict) for r in rows):
+            self._send(400, {"message": "Expected object or array of objects"})
+            return
+
+        status, error = self.server.db.insert(table, rows, self._role())
+        if error:
+            self.server.bump("rejected")
+            self._send(status, {"message": error})
+            return
+
+        self.server.bump("rows", len(rows))
+        if "return=representation" in self.headers.get("Prefer", ""):
+            self._send(201, rows)
+        else:
+            self._send(201)
+
+    def _query(self):
+        """(filters, options) from the query string"""
+        query = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+        options = {k: query.pop(k) for k in ("select", "order", "limit", "offset") if k in query}
+        return query, options
+
+    def do_GET(self):
+        self.server.bump("requests")
+
+        if urllib.parse.urlsplit(self.path).path == "/stats":
+            with self.server.stats_lock:
+                stats = dict(self.server.stats)
+            self._send(200, {"tables": self.server.db.counts(), "server": stats})
+            return
+
+        table = self._table()
+        filters, options = self._query()
+        try:
+            rows = self.server.db.select(
+                table, filters, options.get("order", "id"),
+                int(options.get("limit", 100)), int(options.get("offset", 0)), self._role(),
+            ) if table else None
+        except ValueError as e:
+            self._send(400, {"message": str(e)})
+            return
+        if rows is None:
+            self._send(404, {"message": "Not found"})
+            return
+        if "select" in options:
+            columns = options["select"].split(",")
+            rows = [{c: row.get(c) for c in columns} for row in rows]
+        self._send(200, rows)
+
+    def do_PATCH(self):
+        self.server.bump("requests")
+        raw = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if not self.headers.get("apikey"):
+            self._send(401, {"message": "No API key found in request"})
+            return
+        if self._inject():
+            return
+
+        table = self._table()
+        filters, _ = self._query()
+        try:
+            status, error = self.server.db.update(table, filters, json.loads(raw or b"{}"), self._role())
+        except ValueError as e:
+            status, error = 400, str(e)
+        if error:
+            self.server.bump("rejected")
+            self._send(status, {"message": error})
+            return
+        self._send(204)
+
+
+def start_server(port=0, db_path=":memory:", migrations=True, **options):
+    """
+    Start the stub in a background thread
+    Returns (server, base_url) - call server.shutdown() when done
+    """
+    server = StubServer(("127.0.0.1", port), StubDatabase(db_path, migrations), **options)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Supabase/PostgREST stand-in")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--db", default=":memory:", help="SQLite file (default: in-memory)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="+/- random latency")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests failed with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests failed with 429")
+    parser.add_argument("--service-key", help="Key that bypasses row level security (any other key is anon)")
+    parser.add_argument("--no-migrations", action="store_true", help="Only db/supabase-setup.sql, as an un-migrated project")
+    args = parser.parse_args()
+
+    server = StubServer(
+        ("127.0.0.1", args.port),
+        StubDatabase(args.db, migrations=not args.no_migrations),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        fail_rate=args.fail_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        service_key=args.service_key,
+    )
+    print(f"Supabase stub listening on http://127.0.0.1:{args.port}")
+    print(f'Point sync at it with: SUPABASE_URL=http://127.0.0.1:{args.port} SUPABASE_ANON_KEY=test')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,7 @@ echo "Stopping background services..."
 launchctl unload ~/Library/LaunchAgents/com.bsd.salescopilot.env.plist 2>/dev/null && echo -e "${GREEN}  ✓ Stopped env service${NC}"
 launchctl unload ~/Library/LaunchAgents/com.bsd.salescopilot.sync.plist 2>/dev/null && echo -e "${GREEN}  ✓ Stopped sync service${NC}"
 launchctl unload ~/Library/LaunchAgents/com.bsd.salescopilot.snippetsync.plist 2>/dev/null && echo -e "${GREEN}  ✓ Stopped snippet sync service${NC}"
+launchctl unload ~/Library/LaunchAgents/com.bsd.salescopilot.scheduler.plist 2>/dev/null && echo -e "${GREEN}  ✓ Stopped sync scheduler${NC}"
 
 # --- Step 2: Remove LaunchAgent plists ---
 echo ""
@@ -26,6 +27,7 @@ echo "Removing LaunchAgent files..."
 rm -f ~/Library/LaunchAgents/com.bsd.salescopilot.env.plist && echo -e "${GREEN}  ✓ Removed env.plist${NC}"
 rm -f ~/Library/LaunchAgents/com.bsd.salescopilot.sync.plist && echo -e "${GREEN}  ✓ Removed sync.plist${NC}"
 rm -f ~/Library/LaunchAgents/com.bsd.salescopilot.snippetsync.plist && echo -e "${GREEN}  ✓ Removed snippetsync.plist${NC}"
+rm -f ~/Library/LaunchAgents/com.bsd.salescopilot.scheduler.plist && echo -e "${GREEN}  ✓ Removed scheduler.plist${NC}"
 
 # --- Step 3: Remove symlinks from Espanso ---
 echo ""